@@ -0,0 +1,76 @@
+"""
+Compare the latency of the key store backends (json file and SQLite database).
+Each store is filled with N keys, then adds, lookups and activations are timed.
+
+Usage: python benchmarks/keystore_benchmark.py [N ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from base64 import b64encode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from salty.keystore import JsonKeyStore, SqliteKeyStore  # noqa: E402
+
+SIZES = (10000, 100000)
+OPERATIONS = 100  # Number of timed operations for each measure
+
+
+def generate_entries(count, prefix='key'):
+    """
+    Generate keys with random values
+    :param count: Number of keys
+    :param prefix: Prefix of the name of keys
+    :return: list of keys
+    """
+    return [{'name': f'{prefix}{number}', 'key': b64encode(os.urandom(16)).decode('utf-8'), 'activate': True}
+            for number in range(count)]
+
+
+def measure(function, arguments):
+    """
+    Time a function called once for each argument
+    :return: mean latency in milliseconds
+    """
+    start = time.perf_counter()
+    for argument in arguments:
+        function(argument)
+    return (time.perf_counter() - start) / len(arguments) * 1000
+
+
+def benchmark(store, size):
+    """
+    Fill a key store and time the operations
+    :param store: The KeyStore to measure
+    :param size: Number of keys in the store
+    :return: dictionnary of mean latencies in milliseconds
+    """
+    store.add_many(generate_entries(size))
+    names = [f'key{number}' for number in range(0, size, max(1, size // OPERATIONS))][:OPERATIONS]
+
+    return {
+        'add': measure(store.add, generate_entries(OPERATIONS, 'new')),
+        'lookup': measure(store.get, names),
+        'toggle': measure(lambda name: store.update(name, activate=False), names),
+    }
+
+
+def main(sizes):
+    print(f"{'backend':<8} {'keys':>8} {'add (ms)':>12} {'lookup (ms)':>12} {'toggle (ms)':>12}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            json_path = os.path.join(folder, 'keys.json')
+            with open(json_path, 'w') as file:
+                file.write('[]')
+
+            stores = (('json', JsonKeyStore(json_path)), ('sqlite', SqliteKeyStore(os.path.join(folder, 'keys.db'))))
+            for backend, store in stores:
+                result = benchmark(store, size)
+                print(f"{backend:<8} {size:>8} {result['add']:>12.3f} {result['lookup']:>12.3f} "
+                      f"{result['toggle']:>12.3f}")
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
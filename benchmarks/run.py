@@ -0,0 +1,430 @@
+"""
+Benchmark suite: hash throughput, AES throughput, peak memory of encryption and decryption, key store latency,
+creation rate of many small bundles and reused buffers compared with a new bytes object per block. Everything runs
+offline on generated data in a temporary folder.
+
+Usage:
+    python benchmarks/run.py                                   # run everything with the default sizes
+    python benchmarks/run.py --only hash aes --sizes 1K 1M 1G 4G
+    python benchmarks/run.py --output results.json             # save the results
+    python benchmarks/run.py --baseline results.json           # compare with saved results (exit status 1 on regression)
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CASES = ('hash', 'aes', 'rss', 'keystore', 'small_files', 'buffers')
+SIZES = ('1K', '64K', '1M', '64M')  # Sizes of the hashed files (up to 4G with --sizes)
+AES_SIZE = '64M'  # Data encrypted and decrypted to measure AES
+RSS_SIZE = '256M'  # File encrypted and decrypted to measure the peak memory
+KEYSTORE_SIZES = (1000, 10000)  # Number of keys in the key store
+SMALL_FILES = 1000  # Number of files of 1 KB encrypted
+BUFFERS_SIZE = '64M'  # File read, encrypted or decrypted and discarded to compare the buffers
+PIPELINES = ('cbc/encrypt', 'cbc/decrypt', 'gcm/encrypt', 'gcm/decrypt')
+MIN_DURATION = 0.2  # Small measures are repeated during at least this number of seconds
+ROUNDS = 3  # The best of several rounds is kept to reduce the noise
+THRESHOLD = 10.0  # Percentage of change reported as a regression
+BLOCK = 1024 * 1024
+UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(size):
+    """
+    :param size: Size with a unit (1K, 64M, 4G...)
+    :return: number of bytes
+    """
+    return int(size[:-1]) * UNITS[size[-1].upper()] if size[-1].upper() in UNITS else int(size)
+
+
+def generate_file(path, size, seed=0):
+    """
+    Write a file of random (but reproducible) data
+    :param path: The path of the file
+    :param size: Size of the file in bytes
+    :param seed: Seed of the generated data
+    """
+    block = random.Random(seed).randbytes(min(size, BLOCK))
+    with open(path, 'wb') as file:
+        for _ in range(size // len(block)):
+            file.write(block)
+        file.write(block[:size % len(block)])
+
+
+def repeat(function, size):
+    """
+    Call a function until MIN_DURATION is reached, the best of ROUNDS rounds is kept
+    :param function: The function to measure
+    :param size: Number of bytes processed by a call
+    :return: throughput in MB/s
+    """
+    best = 0.0
+    for _ in range(ROUNDS):
+        count = 0
+        start = time.perf_counter()
+        while True:
+            function()
+            count += 1
+            duration = time.perf_counter() - start
+            if duration >= MIN_DURATION:
+                break
+        best = max(best, size * count / duration / BLOCK)
+    return best
+
+
+def result(value, unit, higher_is_better=True):
+    """
+    :return: dictionnary of a measure
+    """
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+def benchmark_hash(folder, sizes):
+    """
+    Throughput of each hash algorithm for each file size
+    """
+    from salty.hashing import HASH_ALGORITHMS, hash_file
+
+    results = {}
+    for size in sizes:
+        path = os.path.join(folder, f'hash-{size}.bin')
+        generate_file(path, parse_size(size))
+        for algorithm in HASH_ALGORITHMS:
+            throughput = repeat(lambda: hash_file(algorithm, path), parse_size(size))
+            results[f'hash/{algorithm}/{size}'] = result(throughput, 'MB/s')
+        os.remove(path)
+    return results
+
+
+def benchmark_aes(folder, size):
+    """
+    Throughput of AES-CBC (format 1) and AES-GCM frames (format 2) in memory for each key size
+    """
+    from Crypto.Cipher import AES
+    from Crypto.Random import get_random_bytes
+    from salty.container import FRAME_SIZE, decrypt_frames, encrypt_frames
+    from salty.crypto import decrypt_chunks, encrypt_chunks
+
+    block = random.Random(0).randbytes(FRAME_SIZE)
+    chunks = [block] * (parse_size(size) // FRAME_SIZE)
+    results = {}
+    for bits in (128, 192, 256):
+        key = get_random_bytes(bits // 8)
+        iv = get_random_bytes(16)
+        prefix = get_random_bytes(8)
+
+        encrypted = b''.join(encrypt_chunks(AES.new(key, AES.MODE_CBC, iv), chunks))
+        encrypted_chunks = [encrypted[position:position + FRAME_SIZE] for position in range(0, len(encrypted), FRAME_SIZE)]
+        frames = list(encrypt_frames(key, prefix, chunks))
+
+        measures = {
+            'cbc/encrypt': lambda: sum(map(len, encrypt_chunks(AES.new(key, AES.MODE_CBC, iv), chunks))),
+            'cbc/decrypt': lambda: sum(map(len, decrypt_chunks(AES.new(key, AES.MODE_CBC, iv), encrypted_chunks))),
+            'gcm/encrypt': lambda: sum(map(len, encrypt_frames(key, prefix, chunks))),
+            'gcm/decrypt': lambda: sum(map(len, decrypt_frames(key, prefix, frames))),
+        }
+        for name, function in measures.items():
+            results[f'aes/{name}/{bits}'] = result(repeat(function, len(chunks) * FRAME_SIZE), 'MB/s')
+    return results
+
+
+def child_rss(operation, path):
+    """
+    Run an operation in a new process (run.py --child) and get its peak memory
+    :param operation: idle, encrypt or decrypt
+    :param path: The file to encrypt or the bundle to decrypt
+    :return: (peak memory in MB, value printed by the operation)
+    """
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', operation, path],
+                            check=True, capture_output=True, text=True, cwd=os.path.dirname(path)).stdout
+    data = json.loads(output)
+    return data['rss'], data['value']
+
+
+def benchmark_rss(folder, size):
+    """
+    Peak memory of the encryption and the decryption of a file (each one in its own process)
+    """
+    path = os.path.join(folder, 'rss.bin')
+    generate_file(path, parse_size(size))
+    results = {'rss/idle': result(child_rss('idle', path)[0], 'MB', False)}
+    for version in (1, 2):
+        rss, bundle = child_rss(f'encrypt{version}', path)
+        results[f'rss/encrypt/v{version}/{size}'] = result(rss, 'MB', False)
+        rss, valid = child_rss('decrypt', bundle)
+        assert valid
+        results[f'rss/decrypt/v{version}/{size}'] = result(rss, 'MB', False)
+    return results
+
+
+def benchmark_keystore(folder, sizes):
+    """
+    Latency of the key stores for each number of keys (see keystore_benchmark.py)
+    """
+    from keystore_benchmark import benchmark
+    from salty.keystore import JsonKeyStore, SqliteKeyStore
+
+    results = {}
+    for size in sizes:
+        json_path = os.path.join(folder, f'keys-{size}.json')
+        with open(json_path, 'w') as file:
+            file.write('[]')
+        stores = (('json', JsonKeyStore(json_path)), ('sqlite', SqliteKeyStore(os.path.join(folder, f'keys-{size}.db'))))
+        for backend, store in stores:
+            for operation, latency in benchmark(store, size).items():
+                results[f'keystore/{backend}/{operation}/{size}'] = result(latency, 'ms', False)
+    return results
+
+
+def benchmark_small_files(folder, count):
+    """
+    Number of small files encrypted per second in directory bundles and single-file bundles
+    """
+    from salty.crypto import encrypt_files
+
+    source = os.path.join(folder, 'small')
+    os.makedirs(source)
+    for number in range(count):
+        generate_file(os.path.join(source, f'{number}.txt'), 1024, number)
+
+    results = {}
+    for layout, single_file in (('directory', False), ('single_file', True)):
+        report = encrypt_files('bench128', source, 'SHA-256', single_file=single_file)
+        assert not report['errors']
+        results[f'small_files/{layout}/{count}'] = result(count / report['seconds'], 'files/s')
+    return results
+
+
+def reused_blocks(mode, action, file, size, key, iv, prefix):
+    """
+    Encrypt or decrypt a file with readinto and the output= parameter of PyCryptodome in reused buffers, the
+    alternative to a new bytes object per block compared by benchmark_buffers
+    :return: generator of memoryview on the buffers (only valid until the next block)
+    """
+    from Crypto.Cipher import AES
+    from Crypto.Util.Padding import pad, unpad
+    from salty.container import FRAME_SIZE, TAG_SIZE, frames_count, frame_cipher
+
+    block = AES.block_size
+    frame = FRAME_SIZE + TAG_SIZE if mode == 'gcm' and action == 'decrypt' else FRAME_SIZE
+    source = memoryview(bytearray(frame))
+    output = memoryview(bytearray(FRAME_SIZE + TAG_SIZE + block))
+    cipher = AES.new(key, AES.MODE_CBC, iv) if mode == 'cbc' else None
+    last = (frames_count(size) if action == 'decrypt' else -(-size // FRAME_SIZE)) - 1
+    kept = 0
+    for index in range(size // frame + 1):
+        length = file.readinto(source)
+        if not length:
+            break
+        data = source[:length]
+        if mode == 'gcm' and action == 'encrypt':
+            gcm = frame_cipher(key, prefix, index, index == last)
+            gcm.encrypt(data, output=output[:length])
+            output[length:length + TAG_SIZE] = gcm.digest()
+            yield output[:length + TAG_SIZE]
+        elif mode == 'gcm':
+            frame_cipher(key, prefix, index, index == last).decrypt_and_verify(
+                data[:-TAG_SIZE], data[-TAG_SIZE:], output=output[:length - TAG_SIZE])
+            yield output[:length - TAG_SIZE]
+        elif action == 'encrypt':
+            aligned = length - length % block
+            cipher.encrypt(data[:aligned], output=output[:aligned])
+            yield output[:aligned]
+            if aligned < length or length < frame:
+                yield cipher.encrypt(pad(bytes(data[aligned:]), block))
+                return
+        else:
+            # The last AES block may be the padding, it is kept until the next block is decrypted
+            cipher.decrypt(data, output=output[kept:kept + length])
+            yield output[:kept + length - block]
+            output[:block] = output[kept + length - block:kept + length]
+            kept = block
+    if mode == 'cbc' and action == 'encrypt':
+        yield cipher.encrypt(pad(b'', block))
+    elif mode == 'cbc':
+        yield unpad(bytes(output[:kept]), block)
+
+
+def pipeline(name, variant, path):
+    """
+    Read a file and encrypt or decrypt it block by block, like encrypt_stream and decrypt_stream
+    :param name: One of PIPELINES
+    :param variant: copy (read_chunks and a new bytes object per block, as in salty) or reuse (reused_blocks)
+    :param path: The file to encrypt, or the encrypted data (path + '.cbc' or path + '.gcm') to decrypt
+    :return: function running the pipeline (the result is written in the file given to it, or discarded)
+    """
+    from Crypto.Cipher import AES
+    from salty.container import FRAME_SIZE, TAG_SIZE, decrypt_frames, encrypt_frames
+    from salty.crypto import DiscardOutput, decrypt_chunks, encrypt_chunks, read_chunks
+
+    key, iv, prefix = bytes(32), bytes(16), bytes(8)  # Constant so the encrypted files can be generated once
+    mode, action = name.split('/')
+    size = FRAME_SIZE + TAG_SIZE if mode == 'gcm' and action == 'decrypt' else FRAME_SIZE
+    source = path if action == 'encrypt' else f'{path}.{mode}'
+
+    def run(output=None):
+        output = output or DiscardOutput()
+        with open(source, 'rb', buffering=0) as file:
+            if variant == 'reuse':
+                blocks = reused_blocks(mode, action, file, os.path.getsize(source), key, iv, prefix)
+            elif mode == 'cbc':
+                function = encrypt_chunks if action == 'encrypt' else decrypt_chunks
+                blocks = function(AES.new(key, AES.MODE_CBC, iv), read_chunks(file, size))
+            else:
+                function = encrypt_frames if action == 'encrypt' else decrypt_frames
+                blocks = function(key, prefix, read_chunks(file, size))
+            for block in blocks:
+                output.write(block)
+    return run
+
+
+def benchmark_buffers(folder, size):
+    """
+    Throughput, peak of the memory allocated by Python and peak memory of the process of each pipeline, with the
+    functions of salty (a new bytes object per block) and with reused buffers
+    """
+    path = os.path.join(folder, 'buffers.bin')
+    generate_file(path, parse_size(size))
+    for mode in ('cbc', 'gcm'):
+        # The key is constant, so the encrypted data can be decrypted by the pipelines
+        with open(f'{path}.{mode}', 'wb') as file:
+            pipeline(f'{mode}/encrypt', 'copy', path)(file)
+
+    results = {}
+    for name in PIPELINES:
+        for variant in ('copy', 'reuse'):
+            run = pipeline(name, variant, path)
+            results[f'buffers/{name}/{variant}/{size}'] = result(repeat(run, parse_size(size)), 'MB/s')
+
+            tracemalloc.start()
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[f'buffers/{name}/{variant}/traced'] = result(peak / 1024, 'KB', False)
+            results[f'buffers/{name}/{variant}/rss/{size}'] = result(child_rss(f'buffers/{name}/{variant}', path)[0], 'MB',
+                                                              False)
+    return results
+
+
+def run_child(operation, path):
+    """
+    Run an operation measured by child_rss and print its peak memory
+    """
+    value = None
+    if operation.startswith('encrypt'):
+        from salty.crypto import encrypt_file
+        value = encrypt_file('bench128', path, 'SHA-256', version=int(operation[-1]))
+    elif operation == 'decrypt':
+        from salty.crypto import decrypt_stream
+        with open(os.devnull, 'wb') as output:
+            value = decrypt_stream(path, output)
+    elif operation.startswith('buffers/'):
+        _, mode, action, variant = operation.split('/')
+        pipeline(f'{mode}/{action}', variant, path)()
+    print(json.dumps({'rss': peak_rss(), 'value': value}))
+
+
+def peak_rss():
+    """
+    :return: peak memory of the current process in MB
+    """
+    # ru_maxrss keeps the memory of the parent process before exec, VmHWM is reset
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the change of each measure compared with a baseline
+    :param results: The new results
+    :param baseline: The saved results
+    :param threshold: Percentage of change reported as a regression
+    :return: list of regressions
+    """
+    regressions = []
+    print(f"\n{'measure':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, measure in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]['value'], measure['value']
+        change = (after - before) / before * 100 if before else 0.0
+        worse = -change if measure['higher_is_better'] else change
+        flag = ' !' if worse > threshold else ''
+        if flag:
+            regressions.append(name)
+        print(f'{name:<40} {before:>12.3f} {after:>12.3f} {change:>+8.1f}%{flag}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mesurer les performances de salty')
+    parser.add_argument('--only', nargs='+', choices=CASES, default=CASES, help='mesures à lancer')
+    parser.add_argument('--sizes', nargs='+', default=SIZES, help='tailles des fichiers hachés (1K ... 4G)')
+    parser.add_argument('--aes-size', default=AES_SIZE, help='données chiffrées pour mesurer AES')
+    parser.add_argument('--rss-size', default=RSS_SIZE, help='fichier chiffré pour mesurer la mémoire')
+    parser.add_argument('--keys', nargs='+', type=int, default=KEYSTORE_SIZES, help='nombres de clés')
+    parser.add_argument('--small-files', type=int, default=SMALL_FILES, help='nombre de petits fichiers')
+    parser.add_argument('--buffers-size', default=BUFFERS_SIZE, help='fichier lu pour comparer les tampons')
+    parser.add_argument('--output', help='fichier json où enregistrer les résultats')
+    parser.add_argument('--baseline', help='résultats json à comparer')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='pourcentage de régression toléré')
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child(*args.child)
+
+    with tempfile.TemporaryDirectory() as folder:
+        # The keys of the benchmark are in their own key store, the bundles are written in the temporary folder
+        os.environ['SALTY_KEY_STORE'] = os.path.join(folder, 'keys.json')
+        with open(os.environ['SALTY_KEY_STORE'], 'w') as file:
+            file.write('[]')
+        from salty.keys import add_key, generate_key
+        for bits in ('128', '192', '256'):
+            add_key(f'bench{bits}', generate_key(bits))
+        os.chdir(folder)
+
+        results = {}
+        cases = {
+            'hash': lambda: benchmark_hash(folder, args.sizes),
+            'aes': lambda: benchmark_aes(folder, args.aes_size),
+            'rss': lambda: benchmark_rss(folder, args.rss_size),
+            'keystore': lambda: benchmark_keystore(folder, args.keys),
+            'small_files': lambda: benchmark_small_files(folder, args.small_files),
+            'buffers': lambda: benchmark_buffers(folder, args.buffers_size),
+        }
+        for case in args.only:
+            for name, measure in cases[case]().items():
+                print(f"{name:<40} {measure['value']:>12.3f} {measure['unit']}", flush=True)
+                results[name] = measure
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'date': str(datetime.datetime.now()), 'python': platform.python_version(),
+                       'platform': platform.platform(), 'cpus': os.cpu_count(), 'results': results}, file, indent=3)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file)['results'], args.threshold)
+        if regressions:
+            print(f'\n{len(regressions)} régression(s) de plus de {args.threshold:.0f} %')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,16 @@
+from salty.hashing import HASH_ALGORITHMS, generate_salt, hash_file, hash_file_multiple, new_hash, \
+    read_file_buffered, salage, salt, salt_value
+from salty.keys import KeyDeactivatedError, KeyNotFoundError, activate_or_desactivate_key, add_key, add_keys, \
+    delete_key, find_key, generate_key, generate_keys, get_aes_key, get_keys, get_keys_name, key_store, update_key_file
+from salty.keystore import JsonKeyStore, KeyStore, SqliteKeyStore, import_keys, is_valid_key, open_key_store
+from salty.container import IntegrityError
+from salty.dedup import DedupIndex
+from salty.metrics import LogSink, PrometheusSink, Sink, StatsSink
+from salty.sync import SyncManifest, commit_file, scan_files, sync_file
+from salty.rotate import recover, recover_folder, rotate_bundle, rotate_key
+from salty.watch import InotifyWatcher, PollingWatcher, open_watcher
+from salty.bundle import BUNDLE_SUFFIX, is_bundle_file, pack_header, read_header
+from salty.crypto import VERSIONS, bundle_path, decrypt, decrypt_bundles, decrypt_chunks, decrypt_range, \
+    decrypt_stream, encrypt, encrypt_chunks, encrypt_file, encrypt_files, encrypt_stream, list_bundles, list_files, \
+    read_chunks, read_details, remove_bundle, sample_bundles, track_progress, verify_bundle, verify_bundles, \
+    write_bundle_file, write_encrypted_file, write_file
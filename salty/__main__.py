@@ -0,0 +1,4 @@
+import sys
+from salty.cli import main
+
+sys.exit(main())
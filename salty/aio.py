@@ -0,0 +1,113 @@
+import asyncio
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from salty import crypto, keys
+from salty.hashing import hash_file_multiple, read_file_buffered
+
+LIMIT = 32  # Number of operations running at the same time, the other ones wait without blocking the event loop
+
+# The operations run in this pool so the event loop is not blocked by the disk or by AES (hashlib and PyCryptodome
+# release the GIL on large blocks), the keys are read from the same cached key store
+executor = ThreadPoolExecutor(max_workers=LIMIT, thread_name_prefix='salty')
+_semaphores = weakref.WeakKeyDictionary()  # A semaphore can only be used by the event loop that created it
+
+
+class OperationCancelled(Exception):
+    """
+    The coroutine of the operation was cancelled
+    """
+
+
+def set_limit(limit):
+    """
+    Change the number of operations running at the same time (the running operations are not stopped)
+    :param limit: Number of operations
+    """
+    global LIMIT, executor
+    previous = executor
+    LIMIT = limit
+    executor = ThreadPoolExecutor(max_workers=limit, thread_name_prefix='salty')
+    _semaphores.clear()
+    previous.shutdown(wait=False)
+
+
+def semaphore():
+    """
+    :return: The semaphore limiting the operations of the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(LIMIT)
+    return _semaphores[loop]
+
+
+async def run(function, *args, **kwargs):
+    """
+    Run a blocking operation in the pool of threads.
+    The operation receives a progress callback, it is stopped at the next block if the coroutine is cancelled.
+    :param function: The operation (it must accept a progress parameter)
+    :return: The value returned by the operation
+    """
+    cancelled = threading.Event()
+
+    def progress(done):
+        if cancelled.is_set():
+            raise OperationCancelled
+
+    async with semaphore():
+        future = asyncio.get_running_loop().run_in_executor(
+            executor, functools.partial(function, *args, progress=progress, **kwargs))
+        try:
+            return await future
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+
+def _hash_file(selected_hash, file_path, salted, progress):
+    blocks = crypto.track_progress(read_file_buffered(file_path), progress)
+    return hash_file_multiple([selected_hash], blocks, salted)[selected_hash]
+
+
+async def hash_file(selected_hash, file_path, salted=False):
+    """
+    Hash a file without blocking the event loop
+    :param selected_hash: Algorithm to use
+    :param file_path: The path of file
+    :param salted: Append the salt to the hashed data or not
+    :return: String hash
+    """
+    return await run(_hash_file, selected_hash, file_path, salted)
+
+
+async def encrypt_file(key_name, file_path, hash_method, version=1, single_file=False):
+    """
+    Hash and encrypt a file without blocking the event loop
+    :param key_name: name of key
+    :param file_path: The path of the file to encrypt
+    :param hash_method: Algorithm used to check the file after decryption
+    :param version: Format of the encrypted file (see VERSIONS)
+    :param single_file: Write a single file with a binary header instead of a directory
+    :return: The path of the encrypted bundle
+    """
+    return await run(crypto.encrypt_file, key_name, file_path, hash_method, version=version, single_file=single_file)
+
+
+async def decrypt_bundle(bundle_path):
+    """
+    Decrypt an encrypted file in the destination folder without blocking the event loop
+    :param bundle_path: The directory containing the encrypted file and its details (or a single-file bundle)
+    :return: boolean (True if the decrypted file matches the original hash)
+    """
+    return await run(crypto.decrypt, bundle_path)
+
+
+async def find_key(name):
+    """
+    Find a key without blocking the event loop
+    :param name: name of key
+    :return: The value of AES key
+    """
+    return await asyncio.get_running_loop().run_in_executor(executor, keys.find_key, name)
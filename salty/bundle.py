@@ -0,0 +1,108 @@
+import struct
+from base64 import b64decode, b64encode
+
+MAGIC = b'SALTY'  # First bytes of a single-file encrypted bundle
+LAYOUT_VERSION = 1  # Version of the header
+BUNDLE_SUFFIX = '.salty'  # Extension of the single-file encrypted bundles
+HASH_SLOT_SIZE = 64  # Space reserved for the hash, it is only known after encryption
+
+# Fixed part of the header: magic, header version, format of the encrypted data, frame size, size of the data
+FIXED = struct.Struct('>5sBBIQ')
+
+
+def is_bundle_file(path):
+    """
+    :param path: The path of an encrypted file
+    :return: boolean (True for a single-file bundle, False for a directory with data-relations.json)
+    """
+    return str(path).endswith(BUNDLE_SUFFIX)
+
+
+def pack_field(value, length_format='>H'):
+    """
+    Encode a field prefixed by its length
+    :param value: str or bytes
+    :param length_format: struct format of the length
+    :return: bytes
+    """
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    return struct.pack(length_format, len(value)) + value
+
+
+def pack_header(details):
+    """
+    Encode the details of an encrypted file in a binary header, the size of the header does not depend on the hash
+    and the size of the data so it can be rewritten once the data is encrypted
+    :param details: All data necessary for decrypt the file (same keys as data-relations.json)
+    :return: bytes of the header
+    """
+    version = details.get('version', 1)
+    iv = b64decode(details['iv'] if version == 1 else details['nonce'])
+    file_hash = bytes.fromhex(details.get('hash') or '')
+    if len(file_hash) > HASH_SLOT_SIZE:
+        raise ValueError('Le hash est trop long pour l\'en-tête')
+
+    return b''.join([
+        FIXED.pack(MAGIC, LAYOUT_VERSION, version, details.get('frame_size', 0), details.get('size', 0)),
+        pack_field(details['key_name']),
+        pack_field(details['filename']),
+        pack_field(details['extension_file']),
+        pack_field(details.get('hash_method') or '', '>B'),
+        pack_field(bytes.fromhex(details.get('salt', '')), '>B'),
+        pack_field(iv, '>B'),
+        struct.pack('>B', len(file_hash)) + file_hash.ljust(HASH_SLOT_SIZE, b'\0'),
+    ])
+
+
+def read_field(file, length_format='>H'):
+    """
+    Read a field prefixed by its length
+    :param file: File opened in binary mode
+    :param length_format: struct format of the length
+    :return: bytes
+    """
+    size = struct.calcsize(length_format)
+    length, = struct.unpack(length_format, read_exactly(file, size))
+    return read_exactly(file, length)
+
+
+def read_exactly(file, size):
+    """
+    Read a number of bytes or fail if the file is too short
+    :param file: File opened in binary mode
+    :param size: Number of bytes
+    :return: bytes
+    """
+    data = file.read(size)
+    if len(data) != size:
+        raise ValueError('L\'en-tête du fichier chiffré est incomplet')
+    return data
+
+
+def read_header(file):
+    """
+    Read the header of a single-file bundle, the file is left at the beginning of the encrypted data
+    :param file: File opened in binary mode
+    :return: dictionnary of details (same keys as data-relations.json)
+    """
+    magic, layout, version, frame_size, size = FIXED.unpack(read_exactly(file, FIXED.size))
+    if magic != MAGIC or layout != LAYOUT_VERSION:
+        raise ValueError('Ce fichier n\'est pas un fichier chiffré salty')
+
+    details = {'key_name': read_field(file).decode('utf-8'),
+               'filename': read_field(file).decode('utf-8'),
+               'extension_file': read_field(file).decode('utf-8')}
+    hash_method = read_field(file, '>B').decode('utf-8')
+    file_salt = read_field(file, '>B').hex()
+    iv = b64encode(read_field(file, '>B')).decode('utf-8')
+    hash_length, = struct.unpack('>B', read_exactly(file, 1))
+    file_hash = read_exactly(file, HASH_SLOT_SIZE)[:hash_length].hex()
+
+    if hash_method:
+        details.update({'hash_method': hash_method, 'hash': file_hash, 'salt': file_salt})
+    if version == 1:
+        details['iv'] = iv
+    else:
+        details.update({'version': version, 'mode': 'GCM', 'nonce': iv, 'frame_size': frame_size, 'size': size})
+    return details
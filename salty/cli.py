@@ -0,0 +1,358 @@
+import argparse
+import json
+import logging
+import os
+import sys
+from salty import metrics
+from salty.container import IntegrityError
+from salty.crypto import VERSIONS, WORKERS, bundle_path, decrypt_bundles, decrypt_range, decrypt_stream, \
+    encrypt_file, encrypt_files, encrypt_stream, read_chunks, verify_bundles
+from salty.dedup import DEDUP_PATH, DedupIndex
+from salty.hashing import HASH_ALGORITHMS, hash_file_multiple, salt
+from salty.keys import KeyNotFoundError, activate_or_desactivate_key, add_keys, delete_key, generate_keys, get_keys
+from salty.keystore import import_keys, open_key_store
+from salty.rotate import rotate_key
+from salty.sync import MANIFEST_PATH, SyncManifest, sync
+from salty.watch import DEBOUNCE, QUEUE_SIZE, watch
+
+
+def error(message):
+    """
+    Write an error message on the standard error output
+    :param message: The message to write
+    """
+    print(f'salty: {message}', file=sys.stderr)
+
+
+def command_hash(args):
+    status = 0
+    for path in args.files:
+        source = read_chunks(sys.stdin.buffer) if path == '-' else path
+        try:
+            digests = hash_file_multiple(args.algorithm, source, args.salt, parallel=len(args.algorithm) > 1)
+        except (FileNotFoundError, IsADirectoryError) as exception:
+            error(exception)
+            status = 1
+            continue
+
+        for name, digest in digests.items():
+            prefix = f'{name} ' if len(digests) > 1 else ''
+            print(f'{prefix}{digest}  {path}')
+
+    if args.salt:
+        error(f'sel: {salt.bytes.hex()}')
+    return status
+
+
+def command_encrypt(args):
+    if args.no_hash:
+        if args.format == 1:
+            error('--no-hash nécessite le format 2 (AES-GCM authentifié)')
+            return 2
+        args.method = None
+
+    dedup = DedupIndex(args.dedup) if args.dedup else None
+    status = 0
+    for path in args.paths:
+        if path == '-':
+            print(encrypt_stream(args.key, sys.stdin.buffer, args.name, args.extension, args.method,
+                                 version=args.format, workers=args.workers, single_file=args.single_file))
+        elif os.path.isfile(path):
+            print(encrypt_file(args.key, path, args.method, version=args.format, workers=args.workers,
+                               single_file=args.single_file, dedup=dedup))
+        else:
+            report = encrypt_files(args.key, path, args.method, args.workers,
+                                   progress=lambda file, done, total: error(f'[{done}/{total}] {file}'),
+                                   version=args.format, single_file=args.single_file, dedup=dedup)
+            if not report['files']:
+                error(f'{path}: aucun fichier ne correspond')
+                status = 1
+                continue
+            for file, message in report['errors'].items():
+                error(f'{file}: {message}')
+                status = 1
+            print(f"{report['files'] - len(report['errors'])}/{report['files']} fichier(s) chiffré(s) "
+                  f"dont {report['reused']} déjà chiffré(s), {report['throughput']:.2f} Mo/s")
+    return status
+
+
+def command_decrypt(args):
+    bundles = [bundle_path(path) for path in args.bundles] or None
+
+    if args.stdout:
+        if bundles is None or len(bundles) != 1:
+            error('--stdout nécessite un seul fichier chiffré')
+            return 2
+        if args.offset is not None or args.length is not None:
+            length = sys.maxsize if args.length is None else args.length  # --length 0 reads nothing
+            try:
+                for block in decrypt_range(bundles[0], args.offset or 0, length, args.workers):
+                    sys.stdout.buffer.write(block)
+            except IntegrityError as exception:
+                error(exception)
+                return 1
+            return 0
+        if not decrypt_stream(bundles[0], sys.stdout.buffer, workers=args.workers):
+            error('le fichier déchiffré ne correspond pas au fichier de base')
+            return 1
+        return 0
+
+    report = decrypt_bundles(bundles, args.workers)
+    print(json.dumps(report, indent=3))
+    return 1 if report['hash_mismatch'] or report['missing_key'] or report['errors'] else 0
+
+
+def byte_count(value):
+    """
+    :param value: Position or number of bytes
+    :return: int (ArgumentTypeError if it is negative)
+    """
+    count = int(value)
+    if count < 0:
+        raise argparse.ArgumentTypeError(f'nombre d\'octets négatif: {value}')
+    return count
+
+
+def sample_size(value):
+    """
+    :param value: Number of files (100) or percentage of files (5%)
+    :return: int or float between 0 and 1
+    """
+    if value.endswith('%'):
+        return float(value[:-1]) / 100
+    return int(value)
+
+
+def command_verify(args):
+    bundles = [bundle_path(path) for path in args.bundles] or None
+    report = verify_bundles(bundles, args.workers, sample=args.sample, seed=args.seed)
+    print(json.dumps(report, indent=3))
+    return 1 if report['hash_mismatch'] or report['missing_key'] or report['errors'] else 0
+
+
+def command_sync(args):
+    manifest = SyncManifest(args.manifest)
+    try:
+        report = sync(args.key, args.source, args.method, manifest, args.delete, args.workers, args.format,
+                      args.single_file)
+    finally:
+        manifest.close()
+    print(json.dumps(report, indent=3))
+    return 1 if report['errors'] else 0
+
+
+def command_watch(args):
+    def report(path, status, exception):
+        if exception is not None:
+            error(f'{path}: {exception}')
+        else:
+            print(f'{status} {path}', flush=True)
+
+    manifest = SyncManifest(args.manifest)
+    try:
+        watch(args.key, args.source, args.method, args.workers, args.queue, args.debounce, args.format,
+              args.single_file, args.poll, manifest, report)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manifest.close()
+    return 0
+
+
+def command_keys(args):
+    if args.action == 'list':
+        for val in get_keys():
+            print(val['name'] if val['activate'] else val['name'] + ' - Clé désactivé')
+    elif args.action == 'add':
+        if args.count is not None:
+            if len(args.names) != 1:
+                error('--count nécessite un seul préfixe')
+                return 2
+            print('\n'.join(generate_keys(args.names[0], args.count, args.bits)))
+        else:
+            add_keys(args.names, args.bits)
+    elif args.action == 'enable':
+        activate_or_desactivate_key(args.name, True)
+    elif args.action == 'disable':
+        activate_or_desactivate_key(args.name, False)
+    elif args.action == 'delete':
+        delete_key(args.name)
+    elif args.action == 'import':
+        count = import_keys(open_key_store(args.source), open_key_store(args.destination))
+        print(f'{count} clé(s) importée(s) dans {args.destination}')
+    return 0
+
+
+def command_rotate(args):
+    bundles = [bundle_path(path) for path in args.bundles] or None
+    try:
+        report = rotate_key(args.old, args.new, bundles, args.workers,
+                            progress=lambda path, done, total: error(f'[{done}/{total}] {path}'),
+                            deactivate=args.disable)
+    except (KeyNotFoundError, ValueError) as exception:
+        error(f'clé introuvable: {exception}' if isinstance(exception, KeyNotFoundError) else exception)
+        return 2
+    print(json.dumps(report, indent=3))
+    return 1 if report['hash_mismatch'] or report['missing_key'] or report['errors'] else 0
+
+
+def command_gui(args):
+    from salty import gui  # PySimpleGUI and Tk are only loaded for the graphical interface
+
+    gui.main()
+    return 0
+
+
+def create_parser():
+    """
+    Create the parser of the command line
+    :return: ArgumentParser
+    """
+    parser = argparse.ArgumentParser(prog='salty', description='Hacher, chiffrer, déchiffrer et gérer ses clés AES')
+    parser.add_argument('--metrics', metavar='SORTIE',
+                        help='mesurer chaque étape : "log" (une ligne json par opération sur la sortie d\'erreur), '
+                             '"stats" (totaux à la fin) ou un fichier .prom (format texte Prometheus)')
+    commands = parser.add_subparsers(dest='command')
+
+    hash_parser = commands.add_parser('hash', help='hacher des fichiers (- pour l\'entrée standard)')
+    hash_parser.add_argument('files', nargs='*', default=['-'])
+    hash_parser.add_argument('-a', '--algorithm', action='append', choices=list(HASH_ALGORITHMS),
+                             help='algorithme de hachage, peut être répété (SHA-256 par défaut)')
+    hash_parser.add_argument('-s', '--salt', action='store_true', help='appliquer un salage')
+    hash_parser.set_defaults(function=command_hash)
+
+    encrypt_parser = commands.add_parser('encrypt', help='chiffrer des fichiers, des dossiers ou des motifs glob '
+                                                         '(- pour l\'entrée standard)')
+    encrypt_parser.add_argument('paths', nargs='+')
+    encrypt_parser.add_argument('-k', '--key', required=True, help='nom de la clé AES')
+    encrypt_parser.add_argument('-m', '--method', default='SHA-256', choices=list(HASH_ALGORITHMS),
+                                help='algorithme de hachage pour vérifier le fichier déchiffré')
+    encrypt_parser.add_argument('-w', '--workers', type=int, default=WORKERS, help='fichiers chiffrés en même temps')
+    encrypt_parser.add_argument('-f', '--format', type=int, default=1, choices=VERSIONS,
+                                help='format du fichier chiffré (1 = AES-CBC, 2 = trames AES-GCM avec accès aléatoire)')
+    encrypt_parser.add_argument('--no-hash', action='store_true',
+                                help='ne pas hacher le fichier, seule l\'authentification AES-GCM le vérifie (format 2)')
+    encrypt_parser.add_argument('-1', '--single-file', action='store_true',
+                                help='écrire un seul fichier .salty (en-tête binaire + données) au lieu d\'un répertoire')
+    encrypt_parser.add_argument('-d', '--dedup', nargs='?', const=DEDUP_PATH, metavar='INDEX',
+                                help='réutiliser les fichiers déjà chiffrés avec le même contenu et la même clé '
+                                     f'(index {DEDUP_PATH} par défaut)')
+    encrypt_parser.add_argument('--name', default='stdin', help='nom du fichier chiffré depuis l\'entrée standard')
+    encrypt_parser.add_argument('--extension', default='', help='extension du fichier chiffré depuis l\'entrée standard')
+    encrypt_parser.set_defaults(function=command_encrypt)
+
+    decrypt_parser = commands.add_parser('decrypt', help='déchiffrer des fichiers dans "destination" '
+                                                         '(tous ceux de "encrypted-files" par défaut)')
+    decrypt_parser.add_argument('bundles', nargs='*')
+    decrypt_parser.add_argument('-w', '--workers', type=int, default=WORKERS, help='fichiers déchiffrés en même temps')
+    decrypt_parser.add_argument('--stdout', action='store_true', help='écrire le fichier déchiffré sur la sortie standard')
+    decrypt_parser.add_argument('--offset', type=byte_count,
+                                help='position du premier octet à déchiffrer avec --stdout (format 2)')
+    decrypt_parser.add_argument('--length', type=byte_count,
+                                help='nombre d\'octets à déchiffrer avec --stdout (format 2)')
+    decrypt_parser.set_defaults(function=command_decrypt)
+
+    verify_parser = commands.add_parser('verify', help='vérifier des fichiers chiffrés sans écrire les fichiers '
+                                                       'déchiffrés (tous ceux de "encrypted-files" par défaut)')
+    verify_parser.add_argument('bundles', nargs='*')
+    verify_parser.add_argument('-w', '--workers', type=int, default=WORKERS, help='fichiers vérifiés en même temps')
+    verify_parser.add_argument('--sample', type=sample_size, help='vérifier seulement N fichiers (100) ou une part des '
+                                                                  'fichiers (5%%) choisis au hasard')
+    verify_parser.add_argument('--seed', type=int, help='graine du tirage au hasard (pour vérifier les mêmes fichiers)')
+    verify_parser.set_defaults(function=command_verify)
+
+    sync_parser = commands.add_parser('sync', help='chiffrer uniquement les fichiers ajoutés ou modifiés d\'un dossier '
+                                                   'depuis la dernière synchronisation')
+    sync_parser.add_argument('source', nargs='?', default='source')
+    sync_parser.add_argument('-k', '--key', required=True, help='nom de la clé AES')
+    sync_parser.add_argument('-m', '--method', default='SHA-256', choices=list(HASH_ALGORITHMS),
+                             help='algorithme de hachage pour vérifier le fichier déchiffré')
+    sync_parser.add_argument('-w', '--workers', type=int, default=WORKERS, help='fichiers chiffrés en même temps')
+    sync_parser.add_argument('-f', '--format', type=int, default=1, choices=VERSIONS, help='format du fichier chiffré')
+    sync_parser.add_argument('-1', '--single-file', action='store_true', help='écrire un seul fichier .salty par fichier')
+    sync_parser.add_argument('--delete', action='store_true',
+                             help='supprimer les fichiers chiffrés des fichiers supprimés du dossier')
+    sync_parser.add_argument('--manifest', default=MANIFEST_PATH, help=f'état des fichiers ({MANIFEST_PATH} par défaut)')
+    sync_parser.set_defaults(function=command_sync)
+
+    watch_parser = commands.add_parser('watch', help='chiffrer les fichiers d\'un dossier dès qu\'ils sont écrits '
+                                                     '(Ctrl+C pour arrêter)')
+    watch_parser.add_argument('source', nargs='?', default='source')
+    watch_parser.add_argument('-k', '--key', required=True, help='nom de la clé AES')
+    watch_parser.add_argument('-m', '--method', default='SHA-256', choices=list(HASH_ALGORITHMS),
+                              help='algorithme de hachage pour vérifier le fichier déchiffré')
+    watch_parser.add_argument('-w', '--workers', type=int, default=WORKERS, help='fichiers chiffrés en même temps')
+    watch_parser.add_argument('-f', '--format', type=int, default=1, choices=VERSIONS, help='format du fichier chiffré')
+    watch_parser.add_argument('-1', '--single-file', action='store_true', help='écrire un seul fichier .salty par fichier')
+    watch_parser.add_argument('--queue', type=int, default=QUEUE_SIZE, help='fichiers en attente au maximum')
+    watch_parser.add_argument('--debounce', type=float, default=DEBOUNCE,
+                              help='secondes sans écriture avant de chiffrer un fichier')
+    watch_parser.add_argument('--poll', action='store_true', help='parcourir le dossier au lieu d\'utiliser inotify')
+    watch_parser.add_argument('--manifest', default=MANIFEST_PATH, help=f'état des fichiers ({MANIFEST_PATH} par défaut)')
+    watch_parser.set_defaults(function=command_watch)
+
+    keys_parser = commands.add_parser('keys', help='gérer les clés AES')
+    actions = keys_parser.add_subparsers(dest='action', required=True)
+    actions.add_parser('list', help='lister les clés')
+    add_parser = actions.add_parser('add', help='créer une ou plusieurs clés (écrites en une seule fois)')
+    add_parser.add_argument('names', nargs='+', metavar='name')
+    add_parser.add_argument('-n', '--count', type=int, help='créer N clés numérotées dont le nom commence par name')
+    add_parser.add_argument('-b', '--bits', default='128', choices=['128', '192', '256'])
+    for action, help_text in (('enable', 'activer une clé'), ('disable', 'désactiver une clé'),
+                              ('delete', 'supprimer une clé')):
+        actions.add_parser(action, help=help_text).add_argument('name')
+    import_parser = actions.add_parser('import', help='importer les clés d\'un stockage dans un autre')
+    import_parser.add_argument('source')
+    import_parser.add_argument('destination')
+    keys_parser.set_defaults(function=command_keys)
+
+    rotate_parser = commands.add_parser('rotate', help='chiffrer à nouveau avec une nouvelle clé les fichiers chiffrés '
+                                                       'avec une ancienne clé (relancer pour reprendre)')
+    rotate_parser.add_argument('old', help='nom de l\'ancienne clé')
+    rotate_parser.add_argument('new', help='nom de la nouvelle clé')
+    rotate_parser.add_argument('bundles', nargs='*', help='fichiers chiffrés (tous ceux de "encrypted-files" par défaut)')
+    rotate_parser.add_argument('-w', '--workers', type=int, default=WORKERS, help='fichiers chiffrés en même temps')
+    rotate_parser.add_argument('--disable', action='store_true',
+                               help='désactiver l\'ancienne clé si tous ses fichiers ont été chiffrés à nouveau')
+    rotate_parser.set_defaults(function=command_rotate)
+
+    commands.add_parser('gui', help='lancer l\'interface graphique').set_defaults(function=command_gui)
+    return parser
+
+
+def main(argv=None):
+    """
+    Run the command line, the graphical interface is launched without command
+    :param argv: The arguments (sys.argv by default)
+    :return: exit status
+    """
+    args = create_parser().parse_args(argv)
+    if args.command is None:
+        return command_gui(args)
+    if args.command == 'hash' and not args.algorithm:
+        args.algorithm = ['SHA-256']
+
+    sink = None
+    if args.metrics == 'log':
+        logging.basicConfig(level=logging.INFO, format='%(message)s')
+        sink = metrics.enable(metrics.LogSink())
+    elif args.metrics == 'stats':
+        sink = metrics.enable(metrics.StatsSink())
+    elif args.metrics:
+        sink = metrics.enable(metrics.PrometheusSink(args.metrics))
+
+    try:
+        return args.function(args)
+    except KeyNotFoundError as exception:
+        error(f'la clé {exception} n\'existe pas')
+    except ValueError as exception:
+        error(exception)
+    except OSError as exception:
+        error(exception)
+    finally:
+        if isinstance(sink, metrics.PrometheusSink):
+            sink.write()
+        elif isinstance(sink, metrics.StatsSink):
+            print(json.dumps(sink.snapshot(), indent=3), file=sys.stderr)
+        metrics.disable(sink)
+    return 1
@@ -0,0 +1,161 @@
+import struct
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from Crypto.Cipher import AES
+
+FRAME_SIZE = 64 * 1024  # Size of the data encrypted in each frame
+TAG_SIZE = 16  # Size of the authentication tag at the end of each frame
+NONCE_PREFIX_SIZE = 8  # Random part of the nonce, the 4 other bytes are the number of the frame
+
+
+class IntegrityError(ValueError):
+    """
+    A frame of the encrypted file was modified, moved or removed
+    """
+
+
+def frame_cipher(key, prefix, index, last):
+    """
+    Create the cipher of a frame, the number of the frame and the last frame flag are authenticated
+    :param key: The AES key
+    :param prefix: Random part of the nonce
+    :param index: Number of the frame
+    :param last: The frame is the last one of the file
+    :return: AES cipher in GCM mode
+    """
+    cipher = AES.new(key, AES.MODE_GCM, nonce=prefix + struct.pack('>I', index), mac_len=TAG_SIZE)
+    cipher.update(struct.pack('>Q?', index, last))
+    return cipher
+
+
+def number_frames(chunks, first_index=0):
+    """
+    Number the blocks of data and flag the last one
+    :param chunks: Blocks of data
+    :param first_index: Number of the first block
+    :return: generator of (number, block, last)
+    """
+    index = first_index
+    previous = None
+    for chunk in chunks:
+        if previous is not None:
+            yield index, previous, False
+            index += 1
+        previous = chunk
+    yield index, previous if previous is not None else b'', True
+
+
+def ordered_map(function, items, workers):
+    """
+    Apply a function to items with a pool of threads, the results keep the order of the items
+    :param function: The function to apply
+    :param items: The items (only 2 * workers items are read in advance)
+    :param workers: Number of threads (1 to run in the current thread)
+    :return: generator of results
+    """
+    if workers <= 1:
+        yield from map(function, items)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def encrypt_frames(key, prefix, chunks, workers=1, first_index=0):
+    """
+    Encrypt data in independent frames (encrypted data followed by its tag)
+    :param key: The AES key
+    :param prefix: Random part of the nonce
+    :param chunks: Blocks of FRAME_SIZE bytes (except the last one)
+    :param workers: Number of frames encrypted at the same time
+    :param first_index: Number of the first frame
+    :return: generator of frames
+    """
+    def encrypt_frame(frame):
+        index, data, last = frame
+        encrypted, tag = frame_cipher(key, prefix, index, last).encrypt_and_digest(data)
+        return encrypted + tag
+
+    return ordered_map(encrypt_frame, number_frames(chunks, first_index), workers)
+
+
+def decrypt_frames(key, prefix, frames, workers=1, first_index=0, last_index=None):
+    """
+    Decrypt and authenticate frames
+    :param key: The AES key
+    :param prefix: Random part of the nonce
+    :param frames: Frames of FRAME_SIZE + TAG_SIZE bytes (except the last one)
+    :param workers: Number of frames decrypted at the same time
+    :param first_index: Number of the first frame
+    :param last_index: Number of the last frame of the file (by default the last frame read is the last of the file)
+    :return: generator of decrypted blocks
+    """
+    def decrypt_frame(frame):
+        index, data, last = frame
+        if last_index is not None:
+            last = index == last_index
+        try:
+            return frame_cipher(key, prefix, index, last).decrypt_and_verify(data[:-TAG_SIZE], data[-TAG_SIZE:])
+        except ValueError:
+            raise IntegrityError(f'La trame {index} a été modifiée')
+
+    return ordered_map(decrypt_frame, number_frames(frames, first_index), workers)
+
+
+def frames_count(encrypted_size, frame_size=FRAME_SIZE):
+    """
+    :param encrypted_size: Size of the encrypted file
+    :param frame_size: Size of the data of a frame
+    :return: number of frames of the file
+    """
+    return max(1, -(-encrypted_size // (frame_size + TAG_SIZE)))
+
+
+def plain_size(encrypted_size, frame_size=FRAME_SIZE):
+    """
+    :param encrypted_size: Size of the encrypted file
+    :param frame_size: Size of the data of a frame
+    :return: size of the decrypted data
+    """
+    return encrypted_size - frames_count(encrypted_size, frame_size) * TAG_SIZE
+
+
+def read_range(file, encrypted_size, key, prefix, offset, length, frame_size=FRAME_SIZE, workers=1, start=0):
+    """
+    Decrypt a part of an encrypted file, only the frames containing the part are read
+    :param file: The encrypted file opened in binary mode
+    :param encrypted_size: Size of the encrypted file
+    :param key: The AES key
+    :param prefix: Random part of the nonce
+    :param offset: Position of the first byte in the decrypted data
+    :param length: Number of bytes to read
+    :param frame_size: Size of the data of a frame
+    :param workers: Number of frames decrypted at the same time
+    :param start: Position of the first frame in the file (size of the header before the frames)
+    :return: generator of decrypted blocks
+    """
+    length = min(length, plain_size(encrypted_size, frame_size) - offset)
+    if length <= 0:
+        return
+
+    first = offset // frame_size
+    last = (offset + length - 1) // frame_size
+    file.seek(start + first * (frame_size + TAG_SIZE))
+
+    def frames():
+        for _ in range(first, last + 1):
+            yield file.read(frame_size + TAG_SIZE)
+
+    skip = offset - first * frame_size
+    blocks = decrypt_frames(key, prefix, frames(), workers, first, frames_count(encrypted_size, frame_size) - 1)
+    for block in blocks:
+        block = block[skip:skip + length]
+        skip = 0
+        length -= len(block)
+        yield block
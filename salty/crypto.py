@@ -0,0 +1,687 @@
+import datetime
+import glob
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from base64 import b64encode, b64decode
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+from Crypto.Util.Padding import pad, unpad
+from salty import metrics
+from salty.bundle import BUNDLE_SUFFIX, is_bundle_file, pack_header, read_header
+from salty.container import FRAME_SIZE, NONCE_PREFIX_SIZE, TAG_SIZE, IntegrityError, decrypt_frames, \
+    encrypt_frames, read_range
+from salty.files import FILE_MODE
+from salty.hashing import new_hash, salt, salt_value
+from salty.keys import KeyNotFoundError, get_aes_key
+
+CHUNK_SIZE = 64 * 1024  # Size of the blocks read from disk (multiple of AES.block_size)
+WORKERS = 4  # Number of files processed at the same time in batch mode
+VERSIONS = (1, 2)  # Formats of encrypted file: 1 = a single AES-CBC stream, 2 = AES-GCM frames (random access)
+PARTIAL_FOLDER = '.decrypting'  # Files being decrypted, next to destination so they are moved without a copy
+
+
+def write_file(path, data):
+    """
+    Write in file
+    :param path: The path of file
+    :param data: The data to write in file
+    """
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=3)
+
+
+def read_chunks(file, size=CHUNK_SIZE):
+    """
+    Read a file block by block
+    :param file: File opened in binary mode
+    :param size: Size of the blocks
+    :return: generator of blocks
+    """
+    while True:
+        chunk = file.read(size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def track_progress(chunks, progress):
+    """
+    Report the number of bytes read after each block
+    :param chunks: Blocks of data
+    :param progress: Function called with the number of bytes read so far (None to disable)
+    :return: generator of blocks
+    """
+    if progress is None:
+        yield from chunks
+        return
+
+    done = 0
+    for chunk in chunks:
+        done += len(chunk)
+        progress(done)
+        yield chunk
+
+
+def encrypt_chunks(cipher, chunks):
+    """
+    Encrypt data block by block, the padding is only applied on the last block
+    :param cipher: AES cipher in CBC mode
+    :param chunks: Blocks of data (each block except the last must be a multiple of AES.block_size)
+    :return: generator of encrypted blocks
+    """
+    previous = b''
+    for chunk in chunks:
+        if previous:
+            yield cipher.encrypt(previous)
+        previous = chunk
+    yield cipher.encrypt(pad(previous, AES.block_size))
+
+
+def bundle_file_name(file_path):
+    """
+    Get the name given to the encrypted file
+    :param file_path: The path of the file to encrypt
+    :return: name of file without extension and whitespaces
+    """
+    return str(os.path.basename(file_path).split('.')[0]).replace(' ', '_')
+
+
+@metrics.measured('encrypt')
+def encrypt(key_name, file_path, details):
+    """
+    Encrypt file with AES key
+    :param key_name: name of key
+    :param file_path: The path of the file to encrypt
+    :param details: All data necessary for encryption / decryption
+    :return: The path of the directory containing the encrypted file
+    """
+    file_name = bundle_file_name(file_path)
+    with metrics.stage('key'):
+        key = get_aes_key(key_name, encryption=True)  # Get the aes key
+
+    cipher = AES.new(key, AES.MODE_CBC)
+    iv = b64encode(cipher.iv).decode('utf-8')  # Encode in base64 the initialize vector
+
+    # Add data necessary for decrypt the file in the details dictionnary
+    details['iv'] = iv
+    details['filename'] = file_name
+    details['extension_file'] = os.path.splitext(file_path)[1]
+
+    # Encrypt the file block by block while it is written
+    with open(file_path, 'rb') as file:
+        encrypted = metrics.timed('aes', encrypt_chunks(cipher, metrics.timed('read', read_chunks(file))))
+        return write_encrypted_file(encrypted, file_name, details)
+
+
+def bundle_timestamp():
+    """
+    :return: the current date without whitespaces and colons (to avoid errors in paths)
+    """
+    return str(datetime.datetime.now()).replace(' ', '').replace(':', '')
+
+
+def write_encrypted_file(encryptedData, file_name, details, path=None):
+    """
+    Write the encrypted file
+    :param encryptedData: The data encrypted (bytes or iterable of encrypted blocks)
+    :param file_name: Name of file
+    :param details: All data necessary for decrypt the file
+    :param path: The directory to create (a new one in encrypted-files by default)
+    :return: The path of the directory containing the encrypted file
+    """
+    if path is not None:
+        with metrics.stage('mkdir'):
+            os.makedirs(path)
+    # Files with the same name encrypted at the same time get a new timestamp
+    while path is None:
+        path = str(Path().absolute()) + '/encrypted-files/' + file_name + bundle_timestamp() + '_encrypted/'
+        try:
+            with metrics.stage('mkdir'):
+                os.makedirs(path)
+        except FileExistsError:
+            path = None
+
+    if isinstance(encryptedData, (bytes, bytearray)):
+        encryptedData = [encryptedData]
+
+    try:
+        # Write encrypted data in file
+        with open(os.path.join(path, file_name + '.encrypted'), 'wb') as file:
+            for block in encryptedData:
+                with metrics.stage('write', len(block)):
+                    file.write(block)
+
+        # Write all necessary data for decrypt the file
+        with metrics.stage('details'):
+            write_file(os.path.join(path, 'data-relations.json'), details)
+    except BaseException:
+        # Do not leave an incomplete encrypted file (error or operation cancelled)
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+    return path
+
+
+def write_bundle_file(encryptedData, file_name, details, path=None):
+    """
+    Write the encrypted file and its details in a single file (binary header followed by the encrypted data)
+    :param encryptedData: The data encrypted (bytes or iterable of encrypted blocks)
+    :param file_name: Name of file
+    :param details: All data necessary for decrypt the file
+    :param path: The file to create (a new one in encrypted-files by default)
+    :return: The path of the encrypted file
+    """
+    if isinstance(encryptedData, (bytes, bytearray)):
+        encryptedData = [encryptedData]
+
+    if path is not None:
+        file = open(path, 'xb')
+    else:
+        folder = os.path.join(str(Path().absolute()), 'encrypted-files')
+        os.makedirs(folder, exist_ok=True)
+
+    # Files with the same name encrypted at the same time get a new timestamp
+    while path is None:
+        path = os.path.join(folder, file_name + bundle_timestamp() + '_encrypted' + BUNDLE_SUFFIX)
+        try:
+            file = open(path, 'xb')
+        except FileExistsError:
+            path = None
+
+    try:
+        with file:
+            # The hash and the size are only known once the data is encrypted, the header is written again at the end
+            file.write(pack_header(details))
+            for block in encryptedData:
+                with metrics.stage('write', len(block)):
+                    file.write(block)
+            with metrics.stage('details'):
+                file.seek(0)
+                file.write(pack_header(details))
+    except BaseException:
+        # Do not leave an incomplete encrypted file (error or operation cancelled)
+        os.remove(path)
+        raise
+    return path
+
+
+@metrics.measured('encrypt')
+def encrypt_stream(key_name, file, file_name, extension, hash_method, progress=None, version=1, workers=1,
+                   single_file=False, destination=None, digests=None):
+    """
+    Hash and encrypt data in a single read
+    :param key_name: name of key
+    :param file: File opened in binary mode (a file on disk or the standard input)
+    :param file_name: Name of the encrypted file
+    :param extension: Extension given to the file after decryption
+    :param hash_method: Algorithm used to check the file after decryption
+        (None with version 2 to only rely on the authentication of the frames)
+    :param progress: Function called with the number of bytes read so far
+    :param version: Format of the encrypted file (see VERSIONS)
+    :param workers: Number of frames encrypted at the same time (version 2)
+    :param single_file: Write a single file with a binary header instead of a directory with data-relations.json
+    :param destination: The path of the bundle to create (a new one in encrypted-files by default)
+    :param digests: Dictionnary whose keys are algorithms, set to the digest of the data without salt
+    :return: The path of the directory containing the encrypted file (or of the single file)
+    """
+    if version not in VERSIONS:
+        raise ValueError(f'Format de fichier chiffré inconnu: {version}')
+    if hash_method is None and version == 1:
+        raise ValueError('Le format 1 n\'est pas authentifié, un algorithme de hachage est nécessaire')
+    with metrics.stage('key'):
+        key = get_aes_key(key_name, encryption=True)
+
+    # Create details dictionnary for decrypt the file after encryption
+    details = {'key_name': key_name}
+    if hash_method is not None:
+        details = {'hash_method': hash_method, 'hash': '', 'key_name': key_name, 'salt': salt.bytes.hex()}
+    if version == 1:
+        cipher = AES.new(key, AES.MODE_CBC)
+        details['iv'] = b64encode(cipher.iv).decode('utf-8')
+    else:
+        prefix = get_random_bytes(NONCE_PREFIX_SIZE)
+        details.update({'version': version, 'mode': 'GCM', 'nonce': b64encode(prefix).decode('utf-8'),
+                        'frame_size': FRAME_SIZE})
+    details.update({'filename': file_name, 'extension_file': extension})
+    file_hash = new_hash(hash_method) if hash_method is not None else None
+    hashes = [new_hash(name) for name in digests] if digests else []
+    if file_hash is not None:
+        hashes.append(file_hash)
+
+    def hashed_chunks():
+        size = 0
+        chunks = metrics.timed('read', read_chunks(file, FRAME_SIZE if version == 2 else CHUNK_SIZE))
+        for chunk in track_progress(chunks, progress):
+            if hashes:
+                with metrics.stage('hash', len(chunk)):
+                    for chunk_hash in hashes:
+                        chunk_hash.update(chunk)
+            size += len(chunk)
+            yield chunk
+        if digests:
+            digests.update(zip(digests, (chunk_hash.hexdigest() for chunk_hash in hashes)))
+        # The details are written after the encrypted data so the hash is known
+        if file_hash is not None:
+            file_hash.update(salt_value())
+            details['hash'] = file_hash.hexdigest()
+        if version == 2:
+            details['size'] = size
+
+    if version == 1:
+        encrypted = encrypt_chunks(cipher, hashed_chunks())
+    else:
+        encrypted = encrypt_frames(key, prefix, hashed_chunks(), workers)
+    encrypted = metrics.timed('aes', encrypted)
+    if single_file:
+        return write_bundle_file(encrypted, file_name, details, destination)
+    return write_encrypted_file(encrypted, file_name, details, destination)
+
+
+def encrypt_file(key_name, file_path, hash_method, progress=None, version=1, workers=1, single_file=False,
+                 dedup=None, digests=None):
+    """
+    Hash and encrypt a file
+    :param key_name: name of key
+    :param file_path: The path of the file to encrypt
+    :param hash_method: Algorithm used to check the file after decryption
+    :param progress: Function called with the number of bytes read so far
+    :param version: Format of the encrypted file (see VERSIONS)
+    :param workers: Number of frames encrypted at the same time (version 2)
+    :param single_file: Write a single file with a binary header instead of a directory with data-relations.json
+    :param dedup: DedupIndex reusing the bundle of a content already encrypted (None to always encrypt)
+    :param digests: Dictionnary whose keys are algorithms, set to the digest of the file without salt
+        (not set when dedup reuses a bundle)
+    :return: The path of the directory containing the encrypted file (or of the single file)
+    """
+    if dedup is not None:
+        get_aes_key(key_name, encryption=True)  # A bundle of a deactivated key is not reused either
+        options = f'{version}:{hash_method}:{single_file}'
+        return dedup.encrypt(file_path, key_name, options, lambda: encrypt_file(
+            key_name, file_path, hash_method, progress, version, workers, single_file, digests=digests))
+
+    with open(file_path, 'rb') as file:
+        return encrypt_stream(key_name, file, bundle_file_name(file_path), os.path.splitext(file_path)[1],
+                              hash_method, progress, version, workers, single_file, digests=digests)
+
+
+def list_files(source):
+    """
+    List the files of a directory (recursively) or matching a glob pattern
+    :param source: The path of the directory or the glob pattern
+    :return: list of files path
+    """
+    if os.path.isdir(source):
+        return sorted(os.path.join(root, name) for root, _, names in os.walk(source) for name in names)
+    return sorted(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+
+
+def run_pool(function, items, classify, workers=WORKERS, progress=None):
+    """
+    Call a function on many items with a pool of threads
+    :param function: Function called with each item
+    :param items: The items (paths of files or of encrypted files)
+    :param classify: Function called in the calling thread with (item, result) after each item done without error
+    :param workers: Number of items processed at the same time
+    :param progress: Function called after each item with (item, number of items done, number of items)
+    :return: dictionnary of the exceptions raised by the function or by classify for each item
+    """
+    errors = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(function, item): item for item in items}
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                item = futures[future]
+                try:
+                    classify(item, future.result())
+                except Exception as error:
+                    errors[item] = error
+                if progress is not None:
+                    progress(item, done, len(futures))
+        except BaseException:
+            # The items not started yet are not processed if the operation is cancelled
+            executor.shutdown(cancel_futures=True)
+            raise
+    return errors
+
+
+def report_errors(report, errors):
+    """
+    Add the errors of run_pool to the report of encrypted files
+    :param report: dictionnary with the list of missing keys and the dictionnary of the other errors
+    :param errors: dictionnary of the exceptions for each encrypted file
+    """
+    for path, error in errors.items():
+        if isinstance(error, KeyNotFoundError):
+            report['missing_key'].append(path)
+        else:
+            report['errors'][path] = str(error)
+
+
+def encrypt_files(key_name, source, hash_method, workers=WORKERS, progress=None, version=1, single_file=False,
+                  dedup=None):
+    """
+    Encrypt all the files of a directory or matching a glob pattern with a pool of threads
+    :param key_name: name of key
+    :param source: The path of the directory or the glob pattern
+    :param hash_method: Algorithm used to check the files after decryption
+    :param workers: Number of files encrypted at the same time
+    :param progress: Function called after each file with (file path, number of files done, number of files)
+    :param version: Format of the encrypted files (see VERSIONS)
+    :param single_file: Write a single file per file instead of a directory (fewer files and directories to create)
+    :param dedup: DedupIndex reusing the bundle of the files already encrypted (None to always encrypt)
+    :return: dictionnary with the number of files, the errors, the bytes encrypted (without the files whose bundle
+        was reused), the duration, the MB/s and the number of bundles reused
+    """
+    files = list_files(source)
+    hits = dedup.hits if dedup is not None else 0
+    reused_bytes = dedup.reused_bytes if dedup is not None else 0
+    total_bytes = 0
+    start = time.perf_counter()
+
+    def encrypted(path, _):
+        nonlocal total_bytes
+        total_bytes += os.path.getsize(path)
+
+    errors = run_pool(lambda path: encrypt_file(key_name, path, hash_method, version=version, single_file=single_file,
+                                                dedup=dedup),
+                      files, encrypted, workers, progress)
+
+    # The files whose bundle was reused are not counted in the throughput
+    if dedup is not None:
+        total_bytes -= dedup.reused_bytes - reused_bytes
+    duration = time.perf_counter() - start
+    return {'files': len(files), 'errors': {path: str(error) for path, error in errors.items()},
+            'bytes': total_bytes, 'seconds': duration,
+            'throughput': total_bytes / duration / (1024 * 1024) if duration else 0.0,
+            'reused': dedup.hits - hits if dedup is not None else 0}
+
+
+def decrypt_chunks(cipher, chunks):
+    """
+    Decrypt data block by block, the padding is only removed from the last block
+    :param cipher: AES cipher in CBC mode
+    :param chunks: Blocks of encrypted data (each block must be a multiple of AES.block_size)
+    :return: generator of decrypted blocks
+    """
+    previous = b''
+    for chunk in chunks:
+        if previous:
+            yield cipher.decrypt(previous)
+        previous = chunk
+    yield unpad(cipher.decrypt(previous), AES.block_size)
+
+
+def remove_bundle(bundle_path):
+    """
+    Delete an encrypted file and its details
+    :param bundle_path: The directory containing the encrypted file and its details (or a single-file bundle)
+    """
+    if is_bundle_file(bundle_path):
+        if os.path.exists(bundle_path):
+            os.remove(bundle_path)
+    else:
+        shutil.rmtree(bundle_path, ignore_errors=True)
+
+
+def bundle_path(path):
+    """
+    Get the encrypted bundle of a path
+    :param path: A single-file bundle, or the directory, the encrypted file or the data-relations.json of a bundle
+    :return: The path of the single file or of the directory
+    """
+    if is_bundle_file(path) or not os.path.isfile(path):
+        return path
+    return os.path.dirname(path)
+
+
+def read_details(bundle_path):
+    """
+    Get the details for decrypt file (hash method, name of key...)
+    :param bundle_path: The directory containing the encrypted file and its details (or a single-file bundle)
+    :return: dictionnary of details
+    """
+    if is_bundle_file(bundle_path):
+        with open(bundle_path, 'rb') as file:
+            return read_header(file)
+    with open(os.path.join(bundle_path, 'data-relations.json'), 'rb') as rel:
+        return json.load(rel)
+
+
+def encrypted_file_path(bundle_path, details):
+    """
+    :param bundle_path: The directory containing the encrypted file and its details (or a single-file bundle)
+    :param details: The details of the encrypted file
+    :return: The path of the encrypted file
+    """
+    if is_bundle_file(bundle_path):
+        return bundle_path
+    return os.path.join(bundle_path, details['filename'] + '.encrypted')
+
+
+def open_encrypted(bundle_path):
+    """
+    Open an encrypted file at the beginning of its encrypted data
+    :param bundle_path: The directory containing the encrypted file and its details (or a single-file bundle)
+    :return: (details, file opened in binary mode, position of the encrypted data, size of the encrypted data)
+    """
+    if not is_bundle_file(bundle_path):
+        details = read_details(bundle_path)
+        path = encrypted_file_path(bundle_path, details)
+        return details, open(path, 'rb'), 0, os.path.getsize(path)
+
+    file = open(bundle_path, 'rb')
+    try:
+        details = read_header(file)
+    except BaseException:
+        file.close()
+        raise
+    start = file.tell()
+    return details, file, start, os.path.getsize(bundle_path) - start
+
+
+@metrics.measured('decrypt')
+def decrypt_stream(bundle_path, output, progress=None, workers=1):
+    """
+    Decrypt an encrypted file in a file object and check its hash
+    :param bundle_path: The directory containing the encrypted file and its details (or a single-file bundle)
+    :param output: File opened in binary mode where the decrypted data is written
+    :param progress: Function called with the number of encrypted bytes read so far
+    :param workers: Number of frames decrypted at the same time (version 2)
+    :return: boolean (True if the decrypted data matches the original hash and the frames are authentic)
+    """
+    with metrics.stage('details'):
+        details, file, _, _ = open_encrypted(bundle_path)
+    with file:
+        version = details.get('version', 1)  # The files encrypted before the version field are AES-CBC streams
+        if version not in VERSIONS:
+            raise ValueError(f'Format de fichier chiffré inconnu: {version}')
+
+        with metrics.stage('key'):
+            key = get_aes_key(details['key_name'])
+        # The frames of version 2 are authenticated while they are decrypted, the hash is optional
+        check_hash = new_hash(details['hash_method']) if details.get('hash_method') is not None else None
+
+        if version == 1:
+            cipher = AES.new(key, AES.MODE_CBC, b64decode(details['iv']))
+            blocks = decrypt_chunks(cipher, track_progress(metrics.timed('read', read_chunks(file)), progress))
+        else:
+            frames = metrics.timed('read', read_chunks(file, details['frame_size'] + TAG_SIZE))
+            blocks = decrypt_frames(key, b64decode(details['nonce']), track_progress(frames, progress), workers)
+        blocks = metrics.timed('aes', blocks)
+
+        try:
+            for block in blocks:
+                if check_hash is not None:
+                    with metrics.stage('hash', len(block)):
+                        check_hash.update(block)
+                with metrics.stage('write', len(block)):
+                    output.write(block)
+        except IntegrityError:
+            metrics.count('integrity_error')
+            return False
+
+    if check_hash is None:
+        return True
+    check_hash.update(bytes(details['salt'], 'utf-8'))
+    if check_hash.hexdigest() != details['hash']:
+        metrics.count('hash_mismatch')
+        return False
+    return True
+
+
+def decrypt_range(bundle_path, offset, length, workers=1):
+    """
+    Decrypt a part of an encrypted file without reading the rest of the file (version 2 only)
+    :param bundle_path: The directory containing the encrypted file and its details (or a single-file bundle)
+    :param offset: Position of the first byte in the decrypted file
+    :param length: Number of bytes to decrypt
+    :param workers: Number of frames decrypted at the same time
+    :return: generator of decrypted blocks (IntegrityError is raised if a frame was modified)
+    """
+    details, file, start, size = open_encrypted(bundle_path)
+    with file:
+        if details.get('version', 1) != 2:
+            raise ValueError('Seuls les fichiers chiffrés au format 2 permettent de lire une partie du fichier')
+
+        key = get_aes_key(details['key_name'])
+        yield from read_range(file, size, key, b64decode(details['nonce']), offset, length, details['frame_size'],
+                              workers, start)
+
+
+def decrypt(bundle_path, progress=None):
+    """
+    Decrypt an encrypted file in the destination folder and check its hash
+    :param bundle_path: The directory containing the encrypted file and its details (or a single-file bundle)
+    :param progress: Function called with the number of encrypted bytes read so far
+    :return: boolean (True if the decrypted file matches the original hash)
+    """
+    details = read_details(bundle_path)
+
+    destination_folder = os.path.join(str(Path().absolute()), 'destination')
+    os.makedirs(destination_folder, exist_ok=True)
+    name = Path(bundle_path).stem if is_bundle_file(bundle_path) else Path(bundle_path).name
+    destination = os.path.join(destination_folder, name + details['extension_file'])
+
+    # Decrypt in a temporary file outside destination while the tags and the hash are checked, it is only moved to
+    # destination if they match (the folder is only readable by the user until then)
+    partial_folder = os.path.join(str(Path().absolute()), PARTIAL_FOLDER)
+    os.makedirs(partial_folder, mode=0o700, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=partial_folder, suffix='.part', delete=False) as temp:
+        try:
+            valid = decrypt_stream(bundle_path, temp, progress)
+        except BaseException:
+            temp.close()
+            os.remove(temp.name)
+            raise
+
+    if not valid:
+        os.remove(temp.name)
+        return False
+
+    os.chmod(temp.name, FILE_MODE)
+    os.replace(temp.name, destination)
+    return True
+
+
+class DiscardOutput:
+    """
+    File object ignoring the data written (to check an encrypted file without writing the decrypted data)
+    """
+
+    def write(self, data):
+        return len(data)
+
+
+def verify_bundle(bundle_path, progress=None, workers=1):
+    """
+    Decrypt an encrypted file and check its hash, the decrypted data is not written anywhere
+    :param bundle_path: The directory containing the encrypted file and its details (or a single-file bundle)
+    :param progress: Function called with the number of encrypted bytes read so far
+    :param workers: Number of frames decrypted at the same time (version 2)
+    :return: boolean (True if the decrypted data matches the original hash and the frames are authentic)
+    """
+    return decrypt_stream(bundle_path, DiscardOutput(), progress, workers)
+
+
+def list_bundles(folder='encrypted-files'):
+    """
+    List the directories containing an encrypted file and its details, and the single-file bundles
+    :param folder: The folder where the encrypted files are stored
+    :return: list of paths
+    """
+    directories = [os.path.dirname(path) for path in glob.glob(os.path.join(folder, '*', 'data-relations.json'))]
+    return sorted(directories + glob.glob(os.path.join(folder, '*' + BUNDLE_SUFFIX)))
+
+
+def decrypt_bundles(bundles=None, workers=WORKERS, progress=None):
+    """
+    Decrypt and check many encrypted files with a pool of threads
+    :param bundles: The directories and single-file bundles to decrypt (all those of "encrypted-files" by default)
+    :param workers: Number of files decrypted at the same time
+    :param progress: Function called after each file with (directory path, number of files done, number of files)
+    :return: dictionnary with the decrypted files, the hash mismatches, the missing keys, the errors and the duration
+    """
+    if bundles is None:
+        bundles = list_bundles()
+
+    bundles = [str(path) for path in bundles]
+    report = {'decrypted': [], 'hash_mismatch': [], 'missing_key': [], 'errors': {}}
+    start = time.perf_counter()
+
+    def decrypted(path, valid):
+        report['decrypted' if valid else 'hash_mismatch'].append(path)
+
+    report_errors(report, run_pool(decrypt, bundles, decrypted, workers, progress))
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+
+def sample_bundles(bundles, sample, seed=None):
+    """
+    Choose some encrypted files at random
+    :param bundles: The paths of the encrypted files
+    :param sample: Number of files (int) or proportion of the files (float between 0 and 1)
+    :param seed: Seed of the random choice (to check the same files again)
+    :return: list of paths
+    """
+    if isinstance(sample, float):
+        sample = max(1, round(len(bundles) * sample)) if bundles else 0
+    return sorted(random.Random(seed).sample(bundles, min(sample, len(bundles))))
+
+
+def verify_bundles(bundles=None, workers=WORKERS, progress=None, sample=None, seed=None):
+    """
+    Check many encrypted files with a pool of threads without writing the decrypted data
+    :param bundles: The directories and single-file bundles to check (all those of "encrypted-files" by default)
+    :param workers: Number of files checked at the same time
+    :param progress: Function called after each file with (path, number of files done, number of files)
+    :param sample: Only check a number (int) or a proportion (float) of the files chosen at random
+    :param seed: Seed of the random choice
+    :return: dictionnary with the number of files, of files checked and of valid files, the hash mismatches, the
+        missing keys, the errors and the duration
+    """
+    if bundles is None:
+        bundles = list_bundles()
+    total = len(bundles)
+    if sample is not None:
+        bundles = sample_bundles(bundles, sample, seed)
+
+    bundles = [str(path) for path in bundles]
+    report = {'bundles': total, 'checked': len(bundles), 'valid': 0, 'hash_mismatch': [], 'missing_key': [],
+              'errors': {}}
+    start = time.perf_counter()
+
+    def checked(path, valid):
+        if valid:
+            report['valid'] += 1
+        else:
+            report['hash_mismatch'].append(path)
+
+    report_errors(report, run_pool(verify_bundle, bundles, checked, workers, progress))
+    report['seconds'] = time.perf_counter() - start
+    return report
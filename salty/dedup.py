@@ -0,0 +1,159 @@
+import os
+import sqlite3
+import threading
+import time
+from salty.crypto import read_details
+from salty.hashing import hash_file
+
+DEDUP_PATH = os.environ.get('SALTY_DEDUP_INDEX', 'dedup.db')  # Default path of the deduplication index
+DEDUP_HASH = 'blake2b'  # Algorithm of the content digest (without salt so the same content gives the same digest)
+MAX_ENTRIES = 100000  # Number of bundles remembered, the least recently used are forgotten first
+EVICT_INTERVAL = 1000  # Number of remembered files between two evictions (an eviction scans the whole index)
+
+
+class DedupIndex:
+    """
+    Remember the encrypted bundle of each content (digest of the file, key and settings of the encryption),
+    so an unchanged file is not encrypted again. The bundles are never deleted, only forgotten.
+    """
+
+    def __init__(self, path=DEDUP_PATH, max_entries=MAX_ENTRIES):
+        """
+        :param path: The path of the SQLite database
+        :param max_entries: Number of contents and of files remembered
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0  # Number of files whose bundle was reused
+        self.reused_bytes = 0  # Size of these files
+        self._remembered = EVICT_INTERVAL  # Files remembered since the last eviction (the first one trims the index)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS contents ('
+                               'digest TEXT NOT NULL, '
+                               'key_name TEXT NOT NULL, '
+                               'options TEXT NOT NULL, '
+                               'bundle TEXT NOT NULL, '
+                               'used REAL NOT NULL, '
+                               'PRIMARY KEY (digest, key_name, options))')
+            connection.execute('CREATE TABLE IF NOT EXISTS files ('
+                               'path TEXT PRIMARY KEY, '
+                               'size INTEGER NOT NULL, '
+                               'mtime INTEGER NOT NULL, '
+                               'digest TEXT NOT NULL, '
+                               'used REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS contents_used ON contents (used)')
+            connection.execute('CREATE INDEX IF NOT EXISTS files_used ON files (used)')
+
+    def _connection(self):
+        """
+        :return: The connection to the database of the current thread
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def file_digest(self, path, size, mtime):
+        """
+        Get the digest of a file without reading it if its size and modification date did not change
+        :param path: The absolute path of the file
+        :param size: Size of the file
+        :param mtime: Modification date of the file in nanoseconds
+        :return: The digest or None
+        """
+        with self._connection() as connection:
+            row = connection.execute('SELECT digest FROM files WHERE path = ? AND size = ? AND mtime = ?',
+                                     (path, size, mtime)).fetchone()
+            if row is not None:
+                connection.execute('UPDATE files SET used = ? WHERE path = ?', (time.time(), path))
+                return row[0]
+
+    def bundle(self, digest, key_name, options):
+        """
+        Get the bundle of a content, a bundle deleted or encrypted again with another key since is forgotten
+        :param digest: Digest of the content
+        :param key_name: name of key
+        :param options: Settings of the encryption
+        :return: The path of the bundle or None
+        """
+        with self._connection() as connection:
+            row = connection.execute('SELECT bundle FROM contents WHERE digest = ? AND key_name = ? AND options = ?',
+                                     (digest, key_name, options)).fetchone()
+            if row is None:
+                return None
+            if not os.path.exists(row[0]) or read_details(row[0])['key_name'] != key_name:
+                connection.execute('DELETE FROM contents WHERE digest = ? AND key_name = ? AND options = ?',
+                                   (digest, key_name, options))
+                return None
+            connection.execute('UPDATE contents SET used = ? WHERE digest = ? AND key_name = ? AND options = ?',
+                               (time.time(), digest, key_name, options))
+            return row[0]
+
+    def remember(self, path, size, mtime, digest, key_name, options, bundle):
+        """
+        Save the digest of a file and the bundle of its content, the least recently used entries are forgotten
+        :param path: The absolute path of the file
+        :param size: Size of the file
+        :param mtime: Modification date of the file in nanoseconds
+        :param digest: Digest of the content
+        :param key_name: name of key
+        :param options: Settings of the encryption
+        :param bundle: The path of the bundle
+        """
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute('INSERT OR REPLACE INTO files (path, size, mtime, digest, used) VALUES (?, ?, ?, ?, ?)',
+                               (path, size, mtime, digest, now))
+            if bundle is not None:
+                connection.execute('INSERT OR REPLACE INTO contents (digest, key_name, options, bundle, used) '
+                                   'VALUES (?, ?, ?, ?, ?)', (digest, key_name, options, bundle, now))
+
+        # The index can exceed max_entries by EVICT_INTERVAL entries, it is trimmed in batches
+        with self._lock:
+            self._remembered += 1
+            evict = self._remembered >= EVICT_INTERVAL
+            if evict:
+                self._remembered = 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """
+        Forget the least recently used files and contents beyond max_entries
+        """
+        with self._connection() as connection:
+            for table in ('files', 'contents'):
+                connection.execute(f'DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} ORDER BY used DESC '
+                                   f'LIMIT -1 OFFSET ?)', (self.max_entries,))
+
+    def encrypt(self, file_path, key_name, options, encrypt):
+        """
+        Reuse the bundle of a file already encrypted, or encrypt it and remember its bundle.
+        An unchanged file (same size and modification date) is not read at all.
+        :param file_path: The path of the file to encrypt
+        :param key_name: name of key
+        :param options: Settings of the encryption (a bundle is only reused with the same settings)
+        :param encrypt: Function encrypting the file, it returns the path of the bundle
+        :return: The path of the bundle
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        digest = self.file_digest(path, stat.st_size, stat.st_mtime_ns)
+        if digest is None:
+            digest = hash_file(DEDUP_HASH, path)
+
+        bundle = self.bundle(digest, key_name, options)
+        if bundle is not None:
+            with self._lock:
+                self.hits += 1
+                self.reused_bytes += stat.st_size
+            self.remember(path, stat.st_size, stat.st_mtime_ns, digest, key_name, options, None)
+            return bundle
+
+        bundle = os.path.abspath(encrypt())
+        self.remember(path, stat.st_size, stat.st_mtime_ns, digest, key_name, options, bundle)
+        return bundle
@@ -0,0 +1,13 @@
+import os
+
+
+def file_mode():
+    """
+    :return: the mode given by open() to a new file (read once: reading the umask changes it for every thread)
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+FILE_MODE = file_mode()  # The temporary files are created with 0600, the files they replace get the usual mode
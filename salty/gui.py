@@ -0,0 +1,528 @@
+import PySimpleGUI as sg
+import functools
+import os
+import queue
+import re
+import threading
+from salty.crypto import bundle_path, decrypt, decrypt_bundles, encrypt_file, encrypt_files, encrypted_file_path, \
+    list_bundles, list_files, read_details, track_progress
+from salty.hashing import hash_file_multiple, hashing, read_file_buffered, salage
+from salty.keys import KeyNotFoundError, activate_or_desactivate_key, add_key, delete_key, generate_key, get_keys_name
+
+actual_folder = os.path.abspath(".")
+
+
+class OperationCancelled(Exception):
+    """
+    The user cancelled the operation in progress
+    """
+
+
+class Worker:
+    """
+    Run the operations one after the other in a background thread so the window stays responsive.
+    The progress and the results are sent to the window with the events 'job_progress', 'job_done',
+    'job_error' and 'job_cancelled'.
+    """
+
+    def __init__(self, window):
+        """
+        :param window: The window receiving the events
+        """
+        self.window = window
+        self.jobs = queue.Queue()
+        self.cancelled = threading.Event()
+        self.stopped = threading.Event()
+        self._label = ''
+        self._total = 0
+        self._permille = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, name, label, function, total):
+        """
+        Add an operation to the queue
+        :param name: Event of the operation (used to display its result)
+        :param label: Text displayed while the operation runs
+        :param function: Function called with a progress function, returns the result of the operation
+        :param total: Total amount of work given to the progress function (bytes or files)
+        """
+        self.jobs.put((name, label, function, total))
+
+    def pending(self):
+        """
+        :return: number of operations waiting in the queue
+        """
+        return self.jobs.qsize()
+
+    def cancel(self):
+        """
+        Cancel the operation in progress
+        """
+        self.cancelled.set()
+
+    def stop(self):
+        """
+        Cancel the operation in progress, drop the operations waiting and wait for the thread to end
+        (the files of the operation in progress are cleaned up before the program exits)
+        """
+        self.stopped.set()
+        self.cancelled.set()
+        self.jobs.put(None)
+        self._thread.join()
+
+    def _send(self, event, value):
+        """
+        Send an event to the window (not after stop, the window is closed)
+        """
+        if not self.stopped.is_set():
+            self.window.write_event_value(event, value)
+
+    def _progress(self, done):
+        """
+        Send the progress to the window (only when it changes of one per mille)
+        :param done: Amount of work done
+        """
+        if self.cancelled.is_set() or self.stopped.is_set():
+            raise OperationCancelled
+        permille = min(1000, done * 1000 // self._total) if self._total else 1000
+        if permille != self._permille:
+            self._permille = permille
+            self._send('job_progress', (self._label, permille))
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None or self.stopped.is_set():
+                return
+            name, label, function, total = job
+            self.cancelled.clear()
+            self._label, self._total, self._permille = label, total, 0
+            self._send('job_progress', (label, 0))
+            try:
+                result = function(self._progress)
+                self._send('job_done', (name, result))
+            except OperationCancelled:
+                self._send('job_cancelled', label)
+            except Exception as error:
+                self._send('job_error', (name, error))
+
+
+def hash_job(algorithms, file_path, salted, progress):
+    """
+    Hash a file with the selected algorithms
+    :return: dictionnary with the string hash of each algorithm
+    """
+    return hash_file_multiple(algorithms, track_progress(read_file_buffered(file_path), progress), salted,
+                              parallel=len(algorithms) > 1)
+
+
+def encrypt_folder_job(key_name, folder, hash_method, version, single_file, progress):
+    """
+    Encrypt all files of a folder, the progress is the number of files
+    :return: report of encrypt_files
+    """
+    return encrypt_files(key_name, folder, hash_method, progress=lambda path, done, total: progress(done),
+                         version=version, single_file=single_file)
+
+
+def decrypt_all_job(bundles, progress):
+    """
+    Decrypt all the encrypted files, the progress is the number of files
+    :return: report of decrypt_bundles
+    """
+    return decrypt_bundles(bundles, progress=lambda path, done, total: progress(done))
+
+
+def popup_error(message):
+    """
+    Display an error message
+    :param message: The message to display
+    """
+    sg.Popup(message, title='Erreur', custom_text=' Ok ', button_color=('black', 'lightblue'), icon='close.ico')
+
+
+def show_result(window, name, result):
+    """
+    Display the result of an operation done in background
+    :param window: The window of the application
+    :param name: Event of the operation
+    :param result: Value returned by the operation
+    """
+    if name == 'file_now':
+        if len(result) == 1:
+            window['output_hash'].update(next(iter(result.values())))
+        else:
+            window['output_hash'].update('\n'.join(f'{algorithm}: {value}' for algorithm, value in result.items()))
+
+    elif name == 'chiffr_now':
+        created = 'Un fichier .salty a été créé dans "encrypted-files".' if result.endswith('.salty') else \
+            'Un répertoire a été créé dans "encrypted-files" et contient le fichier chiffré.'
+        sg.Popup(
+            f'Votre fichier a été chiffré avec succès. {created}',
+            title='Succès', custom_text=' Ok ', button_color=('black', 'lightblue'))
+
+    elif name == 'chiffr_folder_now':
+        sg.Popup(
+            f"{result['files'] - len(result['errors'])} fichier(s) chiffré(s) sur {result['files']} "
+            f"({result['throughput']:.2f} Mo/s) dans \"encrypted-files\".",
+            title='Succès' if not result['errors'] else 'Erreur', custom_text=' Ok ',
+            button_color=('black', 'lightblue'))
+
+    elif name == 'dechiffr_now':
+        if result:
+            sg.Popup(
+                'Votre fichier a été déchiffré avec succès. Pour le consulter aller dans le dossier "destination"',
+                title='Succès', custom_text=' Ok ', button_color=('black', 'lightblue'))
+        else:
+            popup_error('Le fichier déchiffré ne correspond pas au fichier de base')
+
+    elif name == 'dechiffr_all_now':
+        failures = len(result['hash_mismatch']) + len(result['missing_key']) + len(result['errors'])
+        sg.Popup(
+            f"{len(result['decrypted'])} fichier(s) déchiffré(s) dans le dossier \"destination\".\n"
+            f"{len(result['hash_mismatch'])} fichier(s) ne correspondent pas au fichier de base, "
+            f"{len(result['missing_key'])} clé(s) introuvable(s), {len(result['errors'])} erreur(s).",
+            title='Succès' if not failures else 'Erreur', custom_text=' Ok ', button_color=('black', 'lightblue'))
+
+
+def main():
+    """
+    Create the window of the application and process its events
+    """
+    sg.theme('Dark Grey 6')  # color theme
+
+    # columns for tabs layouts
+    # ------------------------
+    col1_hash = [
+        [sg.T('Hacher un fichier')],
+        [sg.Input(key='path'), sg.FileBrowse('Importer un fichier', key='browse', button_color=('white', 'black'))],
+        [sg.Button('Hacher le fichier', button_color=('black', 'lightblue'), size=(13, 1), key='file_now')],
+        [sg.T()],
+        [sg.T()],
+        [sg.T('Liste des hash')],
+        [sg.Listbox(values=('SHA-1', 'SHA-256', 'SHA-512', 'MD5', 'blake2b'), size=(30, 5), default_values=["SHA-1"],
+                    select_mode=sg.LISTBOX_SELECT_MODE_EXTENDED, enable_events='true', no_scrollbar=True, key='hash_list'),
+         sg.Checkbox('appliquer un salage', key="salage")],
+        [sg.Text('Hash actuel: SHA-1', size=(17, 1), relief=sg.RELIEF_RIDGE, key='display_hash', background_color='grey')]
+    ]
+
+    col2_hash = [
+        [sg.T('Hacher un message')],
+        [sg.Input(key='message')],
+        [sg.Button('Hacher', button_color=('black', 'lightblue'), size=(6, 1), key='now')],
+        [sg.T()],
+        [sg.T()],
+        [sg.T('Résultat')],
+        [sg.Text('', size=(40, 5), relief=sg.RELIEF_RIDGE, key='output_hash')]
+    ]
+
+    col1_chiffr = [
+        [sg.T('Liste des hash')],
+        [sg.Listbox(values=('SHA-1', 'SHA-256', 'SHA-512', 'MD5', 'blake2b'), size=(30, 5), default_values=["SHA-256"],
+                    select_mode='LISTBOX_SELECT_MODE_SINGLE', enable_events='true', no_scrollbar=True,
+                    key='hash_list_chiffr')],
+        [sg.Text('Hash actuel: SHA-256', size=(17, 1), relief=sg.RELIEF_RIDGE, key='display_hash_chiffr',
+                 background_color='grey')],
+        [sg.Combo(['AES-CBC', 'AES-GCM'], size=(10, 1), default_value='AES-CBC', readonly=True, key='mode_chiffr'),
+         sg.Checkbox('vérifier aussi le hash', default=True, key='hash_chiffr')],
+        [sg.Checkbox('un seul fichier .salty par fichier', default=False, key='single_chiffr')]
+    ]
+
+    col2_chiffr = [
+        [sg.T('Liste des clés')],
+        [sg.Listbox(values=(get_keys_name(True)), size=(30, 5), default_values=[get_keys_name(True)[0]],
+                    select_mode='LISTBOX_SELECT_MODE_SINGLE', enable_events='true', key='AES_list')],
+        [sg.Text(f'Clé actuelle: {get_keys_name(True)[0]}', size=(17, 1), relief=sg.RELIEF_RIDGE, key='display_aes',
+                 background_color='grey')]
+    ]
+
+    col3_chiffr = [
+        [sg.T('Chiffrement', font='Arial 11')],
+        [sg.Input(size=(30, 1), key='path_chiffr'),
+         sg.FileBrowse('Importer un fichier', key='browse_chiffr', button_color=('white', 'black'))],
+        [sg.Button('Chiffrer le fichier ', button_color=('black', 'lightblue'), key='chiffr_now')],
+        [sg.Input(size=(30, 1), key='path_chiffr_folder'),
+         sg.FolderBrowse('Importer un dossier', key='browse_chiffr_folder', button_color=('white', 'black'))],
+        [sg.Button('Chiffrer le dossier ', button_color=('black', 'lightblue'), key='chiffr_folder_now')]
+    ]
+
+    col4_chiffr = [
+        [sg.T('Déchiffrement', font='Arial 11')],
+        [sg.Input(size=(30, 1), key='path_dechiffr'),
+         sg.FileBrowse('Importer un fichier', key='browse_dechiffr', button_color=('white', 'black'))],
+        [sg.Button('Déchiffrer le fichier ', button_color=('black', 'lightblue'), key='dechiffr_now')],
+        [sg.T()],
+        [sg.Button('Déchiffrer tous les fichiers ', button_color=('black', 'lightblue'), key='dechiffr_all_now')]
+    ]
+
+    col_gestion = [
+        [sg.Button('Activer la clé', button_color=('black', 'lightgreen'), key='activate', enable_events='true',
+                   size=(13, 1))],
+        [sg.Button('Désactiver la clé', button_color=('black', 'gray'), key='disable', enable_events='true', size=(13, 1))],
+        [sg.Button('Supprimer la clé ', button_color=('black', 'red'), key='delete', enable_events='true', size=(13, 1))]
+    ]
+
+    # Layouts for tab
+    # ---------------
+    hash_layout = [
+        [sg.T()],
+        [sg.T()],
+        [sg.Column(col1_hash), sg.Column(col2_hash)]
+    ]
+
+    chiffr_layout = [
+        [sg.T()],
+        [sg.Text('Configuration', font='Arial 12')],
+        [sg.Column(col1_chiffr), sg.Text(' ' * 35), sg.Column(col2_chiffr)],
+        [sg.T('_' * 116)],
+        [sg.Text('Transformation des fichiers', font='Arial 12')],
+        [sg.Column(col3_chiffr), sg.T(' ' * 9), sg.Column(col4_chiffr)],
+        [sg.T()]
+    ]
+
+    gestion_layout = [
+        [sg.T()],
+        [sg.Text('Création d\'une clé AES'), sg.T(' ' * 42), sg.Text('Nombre de bits')],
+        [sg.Input(key='display_create', do_not_clear=False),
+         sg.Combo(['128', '192', '256'], size=(12, 1), default_value='128', enable_events='true', key='AES_Bits'),
+         sg.Button('Créer la clé ', button_color=('black', 'white'), enable_events='true', key='create_key')],
+        [sg.Text('Gestionnaire de clé', font='Arial 12')],
+        [sg.Listbox(values=(get_keys_name()), size=(30, 5), default_values=["KAES1"],
+                    select_mode='LISTBOX_SELECT_MODE_SINGLE', enable_events='true', key='gestion_list'),
+         sg.Column(col_gestion)]
+    ]
+
+    # header of the application
+    # ------------------------
+    logo = [[sg.Image('logo.png')]]
+    watermark = [[sg.Text()], [sg.Text('Arthur Geay', size=(70, 1), justification='right')],
+                 [sg.Text('Jérémie Delécrin', size=(73, 1), justification='right')]]
+
+    # layout of the application
+    # ------------------------
+    layout = [
+        [sg.Column(logo), sg.Column(watermark, element_justification='right')],
+        [sg.TabGroup([[sg.Tab('Hash', hash_layout), sg.Tab('Chiffrement/Déchiffrement', chiffr_layout),
+                       sg.Tab('Gestionnaire clés', gestion_layout)]])],
+        [sg.Text('', size=(70, 1), key='job_status')],
+        [sg.ProgressBar(1000, orientation='h', size=(50, 15), key='job_progress'),
+         sg.Button('Annuler', button_color=('black', 'red'), key='cancel_job')]
+    ]
+
+    # Create the Window
+    window = sg.Window('Salty', layout)
+    window.SetIcon(icon='salty-icon.ico', pngbase64=None)
+    worker = Worker(window)
+
+    # Event Loop to process "events" and get the "values" of the inputs
+    while True:
+        event, values = window.read()
+        if event in (None, 'Cancel'):  # if user closes window or clicks cancel
+            worker.stop()
+            break
+
+        # input browsing file
+        update_file_path = values['browse']
+        update_file_path2 = values['browse_chiffr']
+        update_file_path3 = values['browse_dechiffr']
+        update_folder_path = values['browse_chiffr_folder']
+        window['path'].update(update_file_path)
+        window['path_chiffr'].update(update_file_path2)
+        window['path_dechiffr'].update(update_file_path3)
+        window['path_chiffr_folder'].update(update_folder_path)
+
+        # Hash Lists
+        update_hash = 'Hash actuel: ' + ', '.join(window['hash_list'].get())  # display hash for hash tab
+        window['display_hash'].update(update_hash)
+
+        update_hash_chiffr = 'Hash actuel: ' + window['hash_list_chiffr'].get()[0]  # display hash for chiffr/dechiffr tab
+        window['display_hash_chiffr'].update(update_hash_chiffr)
+
+        # AES_list
+        update_aes = window['AES_list'].get()
+        if (len(update_aes) > 0):
+            update_aes = 'Clé actuelle: ' + update_aes[0]
+            window['display_aes'].update(update_aes)
+
+        # Events hash
+        # Hash of a message
+        if event == 'now':
+            try:
+                # Get the message and the algorithm to hash
+                message_hash = values['message']
+                assert message_hash != ''
+                update_hash = window['hash_list'].get()
+
+                # Add salt to hash or not
+                if values['salage']:
+                    message_result = hashing(update_hash[0], salage(message_hash))
+                else:
+                    message_result = hashing(update_hash[0], message_hash)
+
+                window['output_hash'].update(message_result)
+            except:
+                sg.Popup('Vous n\'avez pas écrit de message', title='Erreur', custom_text=' Ok ',
+                         button_color=('black', 'lightblue'), icon='close.ico')
+
+        # Hash of a file
+        if event == 'file_now':
+            try:
+                # Get the algorithms and hash the file block by block in a single read (salt is added or not)
+                update_hash = window['hash_list'].get()
+                worker.submit(event, 'Hachage de ' + os.path.basename(update_file_path),
+                              functools.partial(hash_job, update_hash, update_file_path, values['salage']),
+                              os.path.getsize(update_file_path))
+            except FileNotFoundError:
+                popup_error('Vous n\'avez pas selectioné de fichier')
+
+        # Events Encryption / Decryption
+
+        # Encrypt file
+        if event == 'chiffr_now':
+            try:
+                # Get the hash method, the mode and the aes key (AES-GCM is authenticated, the hash is optional)
+                hash_method = window['hash_list_chiffr'].get()[0]
+                version = 2 if values['mode_chiffr'] == 'AES-GCM' else 1
+                if version == 2 and not values['hash_chiffr']:
+                    hash_method = None
+                assert len(window['AES_list'].get()) != 0
+                key_name = window['AES_list'].get()[0]
+
+                worker.submit(event, 'Chiffrement de ' + os.path.basename(update_file_path2),
+                              functools.partial(encrypt_file, key_name, update_file_path2, hash_method,
+                                                version=version, single_file=values['single_chiffr']),
+                              os.path.getsize(update_file_path2))
+            except FileNotFoundError:
+                popup_error('Vous n\'avez pas selectioné de fichier')
+
+        # Encrypt all files of a folder
+        if event == 'chiffr_folder_now':
+            try:
+                assert update_folder_path != ''
+                hash_method = window['hash_list_chiffr'].get()[0]
+                version = 2 if values['mode_chiffr'] == 'AES-GCM' else 1
+                if version == 2 and not values['hash_chiffr']:
+                    hash_method = None
+                assert len(window['AES_list'].get()) != 0
+                key_name = window['AES_list'].get()[0]
+
+                worker.submit(event, 'Chiffrement du dossier ' + os.path.basename(update_folder_path),
+                              functools.partial(encrypt_folder_job, key_name, update_folder_path, hash_method,
+                                                version, values['single_chiffr']),
+                              len(list_files(update_folder_path)))
+            except AssertionError:
+                popup_error('Vous n\'avez pas selectioné de dossier')
+
+        # Decrypt file
+        if event == 'dechiffr_now':
+            try:
+                path_dechiffr = bundle_path(update_file_path3)
+                details = read_details(path_dechiffr)
+
+                worker.submit(event, 'Déchiffrement de ' + details['filename'],
+                              functools.partial(decrypt, path_dechiffr),
+                              os.path.getsize(encrypted_file_path(path_dechiffr, details)))
+            except FileNotFoundError:
+                popup_error('Vous n\'avez pas selectioné de fichier')
+
+        # Decrypt all files of "encrypted-files"
+        if event == 'dechiffr_all_now':
+            bundles = list_bundles()
+            worker.submit(event, 'Déchiffrement de "encrypted-files"', functools.partial(decrypt_all_job, bundles),
+                          len(bundles))
+
+        # Events of the operations running in background
+        if event == 'cancel_job':
+            worker.cancel()
+
+        if event == 'job_progress':
+            label, permille = values[event]
+            window['job_progress'].update_bar(permille)
+            window['job_status'].update(f'{label} ({permille // 10} %) - {worker.pending()} en attente')
+
+        if event in ('job_done', 'job_error', 'job_cancelled'):
+            window['job_progress'].update_bar(0)
+            window['job_status'].update(f'{worker.pending()} en attente' if worker.pending() else '')
+
+        if event == 'job_done':
+            show_result(window, *values[event])
+
+        if event == 'job_error':
+            name, error = values[event]
+            if isinstance(error, KeyNotFoundError):
+                popup_error('La clé utilisée pour chiffrer ce fichier n\'existe plus')
+            elif isinstance(error, FileNotFoundError):
+                popup_error('Vous n\'avez pas selectioné de fichier')
+            else:
+                popup_error(str(error))
+
+        if event == 'job_cancelled':
+            popup_error(values[event] + ' a été annulé')
+
+        ## Events key manager ##
+
+        # Add a key
+        if event == 'create_key':
+            try:
+                # Get the name and bits for create key
+                nameKey = values['display_create']
+                assert nameKey != ''
+                bits = values['AES_Bits']
+
+                # Generate and add key to the keys.json file
+                key = generate_key(bits)
+                add_key(nameKey, key)
+
+                window['gestion_list'].update(values=get_keys_name())
+                window['AES_list'].update(values=get_keys_name(True))
+
+                sg.Popup('La clé ' + nameKey + ' a été créée avec succès', title='Succès', custom_text=' Fermer ',
+                         button_color=('black', 'lightblue'))
+            except AssertionError:
+                sg.Popup('Veuillez nommer la clé pour générer une nouvelle clé', title='Erreur', custom_text=' Ok ',
+                         button_color=('black', 'lightblue'), icon='close.ico')
+            except ValueError:
+                sg.Popup('La clé existe déjà. Veuillez choisir un autre nom de clé', title='Erreur', custom_text=' Ok ',
+                         button_color=('black', 'lightblue'), icon='close.ico')
+
+        # Desactivate a key
+        if event == 'disable':
+            selected_key = window['gestion_list'].get()
+            try:
+                activate_or_desactivate_key(selected_key[0], False)
+                window['gestion_list'].update(values=get_keys_name())
+                window['AES_list'].update(values=get_keys_name(True))
+            except:
+                sg.Popup('Vous n\'avez pas selectioné de clé', title='Erreur', custom_text=' Ok ',
+                         button_color=('black', 'lightblue'), icon='close.ico')
+
+        # Activate a key
+        if event == 'activate':
+            selected_key = window['gestion_list'].get()
+            try:
+                if re.search(' - Clé désactivé', selected_key[0]):
+                    selected_key = selected_key[0].replace(' - Clé désactivé', '')
+
+                activate_or_desactivate_key(selected_key, True)
+                window['gestion_list'].update(values=get_keys_name())
+                window['AES_list'].update(values=get_keys_name(True))
+            except:
+                sg.Popup('Vous n\'avez pas selectioné de clé', title='Erreur', custom_text=' Ok ',
+                         button_color=('black', 'lightblue'), icon='close.ico')
+
+        # Delete a key
+        if event == 'delete':
+            selected_key = window['gestion_list'].get()
+            try:
+                selected_key = selected_key[0]
+                if re.search(' - Clé désactivé', selected_key):
+                    selected_key = selected_key.replace(' - Clé désactivé', '')
+                delete_key(selected_key)
+                window['gestion_list'].update(values=get_keys_name())
+                window['AES_list'].update(values=get_keys_name(True))
+            except:
+                sg.Popup('Vous n\'avez pas selectioné de clé', title='Erreur', custom_text=' Ok ',
+                         button_color=('black', 'lightblue'), icon='close.ico')
+
+    window.close()
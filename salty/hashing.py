@@ -0,0 +1,133 @@
+import hashlib as hs
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from salty import metrics
+
+HASH_BUFFER_SIZE = 1024 * 1024  # Size of the buffer used to hash files
+
+
+def generate_salt():
+    """
+    Generate a random salt
+    :return: unique id
+    """
+    return uuid.uuid1()
+
+
+def salt_value():
+    """
+    Get the salt as it is appended to the hashed data
+    :return: bytes of the salt
+    """
+    return bytes(salt.bytes.hex(), 'utf-8')
+
+
+def salage(encode):
+    """
+    Create a salt for data hashing
+    :param encode: data
+    :return: concatenation of message and salt
+    """
+
+    if type(encode) == str:
+        encode = bytes(encode, 'utf-8')
+    return b''.join([encode, salt_value()])
+
+
+HASH_ALGORITHMS = {
+    'SHA-1': hs.sha1,
+    'SHA-256': hs.sha256,
+    'SHA-512': hs.sha512,
+    'MD5': hs.md5,
+    'blake2b': hs.blake2b,
+}
+
+
+def new_hash(selected_hash):
+    """
+    Create an incremental hash object
+    :param selected_hash: Algorithm to use
+    :return: hashlib object to feed with update()
+    """
+    return HASH_ALGORITHMS[selected_hash]()
+
+
+@metrics.measured('hash')
+def hashing(selected_hash, value):
+    """
+    Hash data
+    :param selected_hash: Algorithm to use
+    :param value: Value to hash
+    :return: String hash
+    """
+
+    if(type(value) == str):
+        value = bytes(value, 'utf-8')
+
+    with metrics.stage('hash', len(value)):
+        return HASH_ALGORITHMS[selected_hash](value).hexdigest()
+
+
+def read_file_buffered(file_path, size=HASH_BUFFER_SIZE):
+    """
+    Read a file with a single reused buffer
+    :param file_path: The path of file
+    :param size: Size of the buffer
+    :return: generator of memoryview on the buffer (only valid until the next block is read)
+    """
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    with open(file_path, 'rb', buffering=0) as file:
+        while True:
+            length = file.readinto(buffer)
+            if not length:
+                break
+            yield view[:length]
+
+
+@metrics.measured('hash_file')
+def hash_file_multiple(selected_hashes, source, salted=False, parallel=False):
+    """
+    Hash a file with several algorithms in a single read
+    :param selected_hashes: Algorithms to use
+    :param source: The path of file or an iterable of blocks of data
+    :param salted: Append the salt to the hashed data or not
+    :param parallel: Update each hash in its own thread (hashlib releases the GIL on large blocks)
+    :return: dictionnary with the string hash of each algorithm
+    """
+    if isinstance(source, (str, os.PathLike)):
+        source = read_file_buffered(source)
+    source = metrics.timed('read', source)
+
+    hashes = {name: new_hash(name) for name in selected_hashes}
+    if parallel and len(hashes) > 1:
+        with ThreadPoolExecutor(max_workers=len(hashes)) as executor:
+            for block in source:
+                # Wait for every hash before reading the next block since the buffer is reused
+                with metrics.stage('hash', len(block)):
+                    list(executor.map(lambda file_hash: file_hash.update(block), hashes.values()))
+    else:
+        for block in source:
+            with metrics.stage('hash', len(block)):
+                for file_hash in hashes.values():
+                    file_hash.update(block)
+
+    if salted:
+        for file_hash in hashes.values():
+            file_hash.update(salt_value())
+    return {name: file_hash.hexdigest() for name, file_hash in hashes.items()}
+
+
+def hash_file(selected_hash, source, salted=False):
+    """
+    Hash a file without loading it in memory
+    :param selected_hash: Algorithm to use
+    :param source: The path of file or an iterable of blocks of data
+    :param salted: Append the salt to the hashed data or not
+    :return: String hash
+    """
+    return hash_file_multiple([selected_hash], source, salted)[selected_hash]
+
+
+salt = generate_salt()  # Génération du sel
@@ -0,0 +1,151 @@
+import os
+from base64 import b64encode, b64decode
+from Crypto.Random import get_random_bytes
+from salty import metrics
+from salty.keystore import open_key_store
+
+KEY_STORE_PATH = os.environ.get('SALTY_KEY_STORE', 'keys.json')  # keys.json or a SQLite database (keys.db)
+
+key_store = open_key_store(KEY_STORE_PATH)
+
+
+def generate_key(bits):
+    """
+    Generate an AES key
+    :param bits: AES key size in bits
+    :return: A base64 encoded character string
+    """
+    if bits == '128':
+        return b64encode(get_random_bytes(16)).decode('utf-8')
+    elif bits == '192':
+        return b64encode(get_random_bytes(24)).decode('utf-8')
+    elif bits == '256':
+        return b64encode(get_random_bytes(32)).decode('utf-8')
+
+
+def get_keys():
+    """
+    Get all generated keys
+    :return: data in json of the key file
+    """
+    return key_store.keys()
+
+
+def get_keys_name(without_desactivate_keys=False):
+    """
+    Get the name of keys
+    :param without_desactivate_keys: Get the desactivate keys or not
+    :return: list of keys name
+    """
+    names = []
+    data_file = get_keys()
+
+    for val in data_file:
+        if val['activate'] is False:
+            if without_desactivate_keys is False:
+                names.append(val['name'] + ' - Clé désactivé')
+        else:
+            names.append(val['name'])
+    return names
+
+
+def update_key_file(data, name):
+    """
+    Update the file that stores the keys
+    :param data: data to append in file
+    :param name: name of key
+    """
+    key_store.add(dict(data, name=name))
+
+
+def add_key(name, key):
+    """
+    Add a key
+    :param name: Name of key
+    :param key: The AES key
+    """
+    data = {'name': name, 'key': key, 'activate': True}
+    update_key_file(data, name)
+
+
+def add_keys(names, bits):
+    """
+    Generate and add many keys at once, the key store is written a single time
+    (no key is added if one of the names already exists)
+    :param names: Names of the keys
+    :param bits: AES key size in bits
+    """
+    key_store.add_many([{'name': name, 'key': generate_key(bits), 'activate': True} for name in names])
+
+
+def generate_keys(prefix, count, bits):
+    """
+    Generate and add numbered keys, the numbers have the same width (prefix01 ... prefix10)
+    :param prefix: Beginning of the names of the keys
+    :param count: Number of keys
+    :param bits: AES key size in bits
+    :return: list of keys name
+    """
+    names = [f'{prefix}{number:0{len(str(count))}d}' for number in range(1, count + 1)]
+    add_keys(names, bits)
+    return names
+
+
+def activate_or_desactivate_key(name, action):
+    """
+    Activate/Desactive an AES key
+    :param name: Name of the key
+    :param action: (True = activate & False = desactivate)
+    """
+    key_store.update(name, activate=bool(action))
+
+
+def delete_key(name):
+    """
+    Delete a key
+    :param name: name of key
+    """
+    key_store.delete(name)
+
+
+class KeyNotFoundError(KeyError):
+    """
+    The key used to encrypt a file does not exist anymore
+    """
+
+
+class KeyDeactivatedError(ValueError):
+    """
+    A deactivated key can only decrypt the files already encrypted with it
+    """
+
+    def __init__(self, name):
+        super().__init__(f'La clé {name} est désactivée, elle ne peut plus chiffrer')
+
+
+def find_key(name):
+    """
+    Find a key in storage key file
+    :param name: name of key
+    :return: The value of AES key
+    """
+    key = key_store.get(name)
+    if key is not None:
+        return key['key']
+
+
+def get_aes_key(name, encryption=False):
+    """
+    Get the decoded value of a key
+    :param name: name of key
+    :param encryption: The key is used to encrypt (KeyDeactivatedError is raised if the key is deactivated)
+    :return: bytes of the AES key
+    """
+    key = key_store.get(name)
+    if key is None:
+        metrics.count('missing_key')
+        raise KeyNotFoundError(name)
+    if encryption and not key['activate']:
+        metrics.count('deactivated_key')
+        raise KeyDeactivatedError(name)
+    return b64decode(key['key'])
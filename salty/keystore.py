@@ -0,0 +1,241 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+
+
+def is_valid_key(data_file, keyName):
+    """
+    Check if the key already exists
+    :param data_file: keys indexed by name
+    :param keyName: Name of the key
+    :return: boolean
+    """
+    if keyName in data_file:
+        raise ValueError('La clé existe déjà')
+    return True
+
+
+class KeyStore(ABC):
+    """
+    Storage of the AES keys.
+    A key is a dictionnary {'name': ..., 'key': ..., 'activate': ...} identified by its name.
+    """
+
+    @abstractmethod
+    def keys(self):
+        """
+        :return: list of all the keys
+        """
+
+    @abstractmethod
+    def get(self, name):
+        """
+        :param name: Name of the key
+        :return: The key or None if it does not exist
+        """
+
+    @abstractmethod
+    def add(self, data):
+        """
+        :param data: The key to add (name, key, activate)
+        """
+
+    def add_many(self, entries):
+        """
+        :param entries: The keys to add, no key is added if one of them already exists
+        """
+        for data in entries:
+            self.add(data)
+
+    @abstractmethod
+    def update(self, name, **fields):
+        """
+        :param name: Name of the key
+        :param fields: Values to change in the key
+        """
+
+    @abstractmethod
+    def delete(self, name):
+        """
+        :param name: Name of the key
+        """
+
+
+class JsonKeyStore(KeyStore):
+    """
+    Keys of a json file kept in memory and indexed by name.
+    The file is parsed again only when its modification time or size changes.
+    """
+
+    def __init__(self, path='keys.json'):
+        """
+        :param path: The path of the key file
+        """
+        self.path = path
+        self._keys = {}
+        self._signature = None
+        self._lock = threading.RLock()
+
+    def _stat(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        """
+        Parse the key file if it changed since the last read
+        """
+        signature = self._stat()
+        if signature != self._signature:
+            with open(self.path) as keys:
+                data_file = json.load(keys)
+            self._keys = {}
+            for val in data_file:
+                self._keys.setdefault(val['name'], val)
+            self._signature = signature
+
+    def _save(self):
+        """
+        Write the keys in a temporary file and replace the key file with it
+        """
+        folder = os.path.dirname(os.path.abspath(self.path))
+        mode = os.stat(self.path).st_mode & 0o7777
+        with tempfile.NamedTemporaryFile('w', dir=folder, suffix='.tmp', delete=False) as keys:
+            json.dump(list(self._keys.values()), keys, indent=3)
+        # The temporary file is created with 0600, the key file keeps the mode chosen by the user
+        os.chmod(keys.name, mode)
+        os.replace(keys.name, self.path)
+        self._signature = self._stat()
+
+    def keys(self):
+        with self._lock:
+            self._load()
+            return [dict(val) for val in self._keys.values()]
+
+    def get(self, name):
+        with self._lock:
+            self._load()
+            return self._keys.get(name)
+
+    def add(self, data):
+        self.add_many([data])
+
+    def add_many(self, entries):
+        with self._lock:
+            self._load()
+            added = {}
+            for data in entries:
+                is_valid_key(self._keys, data['name'])
+                is_valid_key(added, data['name'])
+                added[data['name']] = data
+            self._keys.update(added)
+            self._save()
+
+    def update(self, name, **fields):
+        with self._lock:
+            self._load()
+            if name in self._keys:
+                self._keys[name] = dict(self._keys[name], **fields)
+            self._save()
+
+    def delete(self, name):
+        with self._lock:
+            self._load()
+            self._keys.pop(name, None)
+            self._save()
+
+
+class SqliteKeyStore(KeyStore):
+    """
+    Keys stored in a SQLite database indexed by name.
+    Every change is a transaction, so several processes can write at the same time.
+    """
+
+    COLUMNS = ('key', 'activate')
+
+    def __init__(self, path='keys.db'):
+        """
+        :param path: The path of the database
+        """
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS keys ('
+                               'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                               'name TEXT NOT NULL UNIQUE, '
+                               'key TEXT NOT NULL, '
+                               'activate INTEGER NOT NULL DEFAULT 1)')
+
+    def _connection(self):
+        """
+        :return: The connection to the database of the current thread
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _to_dict(row):
+        return {'name': row[0], 'key': row[1], 'activate': bool(row[2])}
+
+    def keys(self):
+        rows = self._connection().execute('SELECT name, key, activate FROM keys ORDER BY id')
+        return [self._to_dict(row) for row in rows]
+
+    def get(self, name):
+        row = self._connection().execute('SELECT name, key, activate FROM keys WHERE name = ?', (name,)).fetchone()
+        if row is not None:
+            return self._to_dict(row)
+
+    def add(self, data):
+        self.add_many([data])
+
+    def add_many(self, entries):
+        try:
+            with self._connection() as connection:
+                connection.executemany('INSERT INTO keys (name, key, activate) VALUES (?, ?, ?)',
+                                       ((data['name'], data['key'], bool(data.get('activate', True)))
+                                        for data in entries))
+        except sqlite3.IntegrityError:
+            raise ValueError('La clé existe déjà')
+
+    def update(self, name, **fields):
+        fields = {column: value for column, value in fields.items() if column in self.COLUMNS}
+        if not fields:
+            return
+        assignments = ', '.join(f'{column} = ?' for column in fields)
+        with self._connection() as connection:
+            connection.execute(f'UPDATE keys SET {assignments} WHERE name = ?', (*fields.values(), name))
+
+    def delete(self, name):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM keys WHERE name = ?', (name,))
+
+
+def open_key_store(path):
+    """
+    Open the key store matching the extension of the file
+    :param path: The path of the key store (.json for a json file, otherwise a SQLite database)
+    :return: KeyStore
+    """
+    if os.path.splitext(path)[1] == '.json':
+        return JsonKeyStore(path)
+    return SqliteKeyStore(path)
+
+
+def import_keys(source, destination):
+    """
+    Copy the keys of a key store in another one, the keys already in the destination are kept
+    :param source: The KeyStore to read
+    :param destination: The KeyStore to fill
+    :return: number of imported keys
+    """
+    entries = [val for val in source.keys() if destination.get(val['name']) is None]
+    destination.add_many(entries)
+    return len(entries)
+
@@ -0,0 +1,276 @@
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from salty.files import FILE_MODE
+
+sinks = []  # Receivers of the measures, nothing is measured while the list is empty
+_local = threading.local()
+_disabled = nullcontext()
+
+
+class Sink(ABC):
+    """
+    Receiver of the measures. A record is a dictionnary with the operation (encrypt, decrypt, hash_file... or None
+    for a measure done outside an operation), its duration, its error, the seconds / bytes / calls of each stage and
+    the counters (hash_mismatch, missing_key, deactivated_key...).
+    """
+
+    @abstractmethod
+    def emit(self, record):
+        """
+        :param record: The measures of an operation
+        """
+
+
+class StatsSink(Sink):
+    """
+    Totals of all the records, readable in the process with snapshot()
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.operations = {}
+        self.stages = {}
+        self.counters = {}
+
+    def emit(self, record):
+        with self._lock:
+            if record['operation'] is not None:
+                total = self.operations.setdefault(record['operation'], {'count': 0, 'seconds': 0.0, 'errors': 0})
+                total['count'] += 1
+                total['seconds'] += record['seconds']
+                total['errors'] += record['error'] is not None
+            for name, stage in record['stages'].items():
+                total = self.stages.setdefault(name, {'count': 0, 'seconds': 0.0, 'bytes': 0})
+                for field in total:
+                    total[field] += stage[field]
+            for name, value in record['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        """
+        :return: copy of the totals by operation, by stage and by counter
+        """
+        with self._lock:
+            return json.loads(json.dumps({'operations': self.operations, 'stages': self.stages,
+                                          'counters': self.counters}))
+
+
+class LogSink(Sink):
+    """
+    Write each record as a line of json in a logger
+    """
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger('salty.metrics')
+        self.level = level
+
+    def emit(self, record):
+        self.logger.log(self.level, json.dumps(record))
+
+
+class PrometheusSink(StatsSink):
+    """
+    Write the totals in a file with the text format of Prometheus (for the textfile collector of node_exporter)
+    """
+
+    def __init__(self, path, interval=1.0):
+        """
+        :param path: The path of the file (.prom)
+        :param interval: Minimum number of seconds between two writes of the file
+        """
+        super().__init__()
+        self.path = path
+        self.interval = interval
+        self._written = 0.0
+
+    def emit(self, record):
+        super().emit(record)
+        if time.monotonic() - self._written >= self.interval:
+            self.write()
+
+    def write(self):
+        """
+        Write the totals, the file is replaced at once so it is never read half written
+        """
+        self._written = time.monotonic()
+        totals = self.snapshot()
+        lines = []
+        metrics = (('salty_operations_total', 'operations', 'operation', 'count'),
+                   ('salty_operation_seconds_total', 'operations', 'operation', 'seconds'),
+                   ('salty_operation_errors_total', 'operations', 'operation', 'errors'),
+                   ('salty_stage_seconds_total', 'stages', 'stage', 'seconds'),
+                   ('salty_stage_bytes_total', 'stages', 'stage', 'bytes'),
+                   ('salty_stage_calls_total', 'stages', 'stage', 'count'))
+        for metric, group, label, field in metrics:
+            lines.append(f'# TYPE {metric} counter')
+            lines.extend(f'{metric}{{{label}="{name}"}} {values[field]}' for name, values in totals[group].items())
+        lines.append('# TYPE salty_errors_total counter')
+        lines.extend(f'salty_errors_total{{counter="{name}"}} {value}' for name, value in totals['counters'].items())
+
+        folder = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', dir=folder, prefix='.', suffix='.prom', delete=False) as file:
+            file.write('\n'.join(lines) + '\n')
+        # The collector of node_exporter usually runs as another user, the file must not keep the mode 0600
+        os.chmod(file.name, FILE_MODE)
+        os.replace(file.name, self.path)
+
+
+def enable(sink):
+    """
+    Start sending the measures to a sink
+    :param sink: Sink
+    :return: the sink
+    """
+    sinks.append(sink)
+    return sink
+
+
+def disable(sink=None):
+    """
+    Stop sending the measures to a sink (to every sink by default)
+    :param sink: Sink
+    """
+    if sink is None:
+        sinks.clear()
+    elif sink in sinks:
+        sinks.remove(sink)
+
+
+def new_record(operation):
+    return {'operation': operation, 'seconds': 0.0, 'error': None, 'stages': {}, 'counters': {}}
+
+
+def emit(record):
+    for sink in list(sinks):
+        sink.emit(record)
+
+
+class Operation:
+    """
+    Measure an operation, the stages and counters measured in the same thread are added to its record
+    """
+
+    def __init__(self, name):
+        self.record = new_record(name)
+
+    def __enter__(self):
+        self.parent = getattr(_local, 'record', None)
+        _local.record = self.record
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, kind, error, traceback):
+        self.record['seconds'] = time.perf_counter() - self.start
+        if kind is not None:
+            self.record['error'] = kind.__name__
+        _local.record = self.parent
+        emit(self.record)
+
+
+class Stage:
+    """
+    Measure a stage of an operation, the time spent in the stages nested in it is not counted twice
+    """
+
+    def __init__(self, name, size=0):
+        self.name = name
+        self.size = size
+
+    def __enter__(self):
+        stack = _local.__dict__.setdefault('stages', [])
+        stack.append(self)
+        self.nested = 0.0
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, kind, error, traceback):
+        elapsed = time.perf_counter() - self.start
+        stack = _local.stages
+        stack.pop()
+        if stack:
+            stack[-1].nested += elapsed
+
+        record = getattr(_local, 'record', None)
+        standalone = record is None
+        if standalone:
+            record = new_record(None)
+        stage = record['stages'].setdefault(self.name, {'count': 0, 'seconds': 0.0, 'bytes': 0})
+        stage['count'] += 1
+        stage['seconds'] += elapsed - self.nested
+        stage['bytes'] += self.size
+        if standalone:
+            emit(record)
+
+
+def stage(name, size=0):
+    """
+    :param name: Name of the stage
+    :param size: Number of bytes processed
+    :return: context manager measuring a stage (it does nothing while no sink is enabled)
+    """
+    return Stage(name, size) if sinks else _disabled
+
+
+def timed(name, blocks):
+    """
+    Measure the time spent producing each block of data and its size
+    :param name: Name of the stage
+    :param blocks: Iterable of blocks
+    :return: iterable of the same blocks (the blocks themselves while no sink is enabled)
+    """
+    if not sinks:
+        return blocks
+    return _timed(name, blocks)
+
+
+def _timed(name, blocks):
+    iterator = iter(blocks)
+    while True:
+        with Stage(name) as measure:
+            try:
+                block = next(iterator)
+            except StopIteration:
+                return
+            measure.size = len(block)
+        yield block
+
+
+def count(name, value=1):
+    """
+    Increase a counter (hash_mismatch, missing_key, deactivated_key...)
+    :param name: Name of the counter
+    :param value: Increment
+    """
+    if not sinks:
+        return
+    record = getattr(_local, 'record', None)
+    if record is None:
+        record = new_record(None)
+        record['counters'][name] = value
+        emit(record)
+    else:
+        record['counters'][name] = record['counters'].get(name, 0) + value
+
+
+def measured(name):
+    """
+    Decorator measuring each call of a function as an operation (the function is called directly while no sink is
+    enabled)
+    :param name: Name of the operation
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not sinks:
+                return function(*args, **kwargs)
+            with Operation(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,166 @@
+import glob
+import os
+import shutil
+import threading
+import time
+from salty.bundle import is_bundle_file
+from salty.crypto import WORKERS, decrypt_stream, encrypt_stream, list_bundles, read_details, report_errors, run_pool
+from salty.keys import activate_or_desactivate_key, get_aes_key
+
+ROTATING_SUFFIX = '.rotating'  # New bundle being written next to the bundle it replaces
+OLD_SUFFIX = '.old'  # Bundle replaced, removed once the new bundle has its name
+
+
+def rotation_paths(bundle_path):
+    """
+    :param bundle_path: The directory containing the encrypted file and its details (or a single-file bundle)
+    :return: (path of the bundle, path of the new bundle being written, path of the replaced bundle), the temporary
+        bundles are hidden so they are not listed with the other bundles
+    """
+    bundle_path = os.path.normpath(bundle_path)
+    folder, name = os.path.split(bundle_path)
+    return bundle_path, os.path.join(folder, f'.{name}{ROTATING_SUFFIX}'), os.path.join(folder, f'.{name}{OLD_SUFFIX}')
+
+
+def remove_path(path):
+    """
+    Delete a file or a directory if it exists
+    :param path: The path to delete
+    """
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def recover(bundle_path):
+    """
+    Finish the replacement of a bundle interrupted by a crash, or remove its incomplete new bundle
+    :param bundle_path: The directory containing the encrypted file and its details (or a single-file bundle)
+    """
+    bundle_path, rotating, old = rotation_paths(bundle_path)
+    if os.path.lexists(old):
+        # The old bundle is only moved once the new one is complete
+        if not os.path.lexists(bundle_path):
+            os.rename(rotating, bundle_path)
+        remove_path(old)
+    remove_path(rotating)
+
+
+def recover_folder(folder='encrypted-files'):
+    """
+    Recover the rotations interrupted in a folder (see recover)
+    :param folder: The folder where the encrypted files are stored
+    """
+    names = set()
+    for suffix in (ROTATING_SUFFIX, OLD_SUFFIX):
+        for path in glob.glob(os.path.join(folder, '.*' + suffix)):
+            names.add(os.path.basename(path)[1:-len(suffix)])
+    for name in names:
+        recover(os.path.join(folder, name))
+
+
+def rotate_bundle(bundle_path, old_key, new_key, workers=1):
+    """
+    Decrypt an encrypted file with the old key and encrypt it again with the new key, the decrypted data only goes
+    through a pipe between the two. The new bundle replaces the old one under the same path once it is complete and
+    the hash of the decrypted data matches.
+    :param bundle_path: The directory containing the encrypted file and its details (or a single-file bundle)
+    :param old_key: name of the key to replace
+    :param new_key: name of the new key
+    :param workers: Number of frames encrypted and decrypted at the same time (version 2)
+    :return: True if the bundle was encrypted again, False if the hash did not match (the bundle is kept), None if the
+        bundle is not encrypted with the old key
+    """
+    recover(bundle_path)
+    details = read_details(bundle_path)
+    if details['key_name'] != old_key:
+        return None
+    bundle_path, rotating, old = rotation_paths(bundle_path)
+
+    reader, writer = (os.fdopen(descriptor, mode) for descriptor, mode in zip(os.pipe(), ('rb', 'wb')))
+    outcome = {}
+
+    def decrypt_to_pipe():
+        try:
+            outcome['valid'] = decrypt_stream(bundle_path, writer, workers=workers)
+        except BaseException as error:
+            outcome['error'] = error
+        finally:
+            try:
+                writer.close()
+            except OSError:
+                pass  # The encryption stopped reading
+
+    thread = threading.Thread(target=decrypt_to_pipe)
+    thread.start()
+    try:
+        # The new bundle keeps the format, the layout, the hash method and the name of the old one
+        with reader:
+            encrypt_stream(new_key, reader, details['filename'], details['extension_file'],
+                           details.get('hash_method'), version=details.get('version', 1), workers=workers,
+                           single_file=is_bundle_file(bundle_path), destination=rotating)
+    except BaseException:
+        thread.join()
+        remove_path(rotating)
+        raise
+    thread.join()
+
+    if 'error' in outcome or not outcome['valid']:
+        remove_path(rotating)
+        if 'error' in outcome:
+            raise outcome['error']
+        return False
+
+    if is_bundle_file(bundle_path):
+        os.replace(rotating, bundle_path)
+    else:
+        # A directory can not replace another one, the old one is moved away first (see recover)
+        os.rename(bundle_path, old)
+        os.rename(rotating, bundle_path)
+        remove_path(old)
+    return True
+
+
+def rotate_key(old_key, new_key, bundles=None, workers=WORKERS, progress=None, deactivate=False,
+               folder='encrypted-files'):
+    """
+    Encrypt again with a new key all the encrypted files of an old key with a pool of threads.
+    The bundles already encrypted with the new key are skipped, so an interrupted rotation is resumed by running it
+    again.
+    :param old_key: name of the key to replace
+    :param new_key: name of the new key
+    :param bundles: The directories and single-file bundles to rotate (all those of the folder by default)
+    :param workers: Number of files encrypted again at the same time
+    :param progress: Function called after each file with (path, number of files done, number of files)
+    :param deactivate: Deactivate the old key once all its encrypted files are rotated without error
+    :param folder: The folder where the encrypted files are stored
+    :return: dictionnary with the number of files, the rotated files, the number of files of other keys, the hash
+        mismatches, the missing keys, the errors and the duration
+    """
+    if old_key == new_key:
+        raise ValueError('La nouvelle clé doit être différente de l\'ancienne')
+    get_aes_key(new_key, encryption=True)  # KeyNotFoundError or KeyDeactivatedError before any file is read
+
+    if bundles is None:
+        recover_folder(folder)
+        bundles = list_bundles(folder)
+
+    bundles = [str(path) for path in bundles]
+    report = {'bundles': len(bundles), 'rotated': [], 'skipped': 0, 'hash_mismatch': [], 'missing_key': [],
+              'errors': {}}
+    start = time.perf_counter()
+
+    def rotated(path, valid):
+        if valid is None:
+            report['skipped'] += 1
+        else:
+            report['rotated' if valid else 'hash_mismatch'].append(path)
+
+    report_errors(report, run_pool(lambda path: rotate_bundle(path, old_key, new_key), bundles, rotated, workers,
+                                   progress))
+
+    if deactivate and not (report['hash_mismatch'] or report['missing_key'] or report['errors']):
+        activate_or_desactivate_key(old_key, False)
+    report['seconds'] = time.perf_counter() - start
+    return report
@@ -0,0 +1,200 @@
+import os
+import sqlite3
+import threading
+import time
+from salty.crypto import WORKERS, encrypt_file, remove_bundle, run_pool
+from salty.dedup import DEDUP_HASH
+from salty.hashing import hash_file
+
+MANIFEST_PATH = os.path.join('encrypted-files', 'sync.db')  # Default path of the manifest
+
+
+class SyncManifest:
+    """
+    State of the synchronized files (size, modification date, digest of the content and bundle) in a SQLite
+    database. Each file is saved as soon as it is encrypted, so an interrupted synchronization starts again where
+    it stopped.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        """
+        :param path: The path of the database
+        """
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._local = threading.local()
+        self._connections = []  # Connections of every thread, closed by close()
+        self._lock = threading.Lock()
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS files ('
+                               'path TEXT PRIMARY KEY, '
+                               'size INTEGER NOT NULL, '
+                               'mtime INTEGER NOT NULL, '
+                               'digest TEXT NOT NULL, '
+                               'bundle TEXT NOT NULL)')
+
+    def _connection(self):
+        """
+        :return: The connection to the database of the current thread
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Only used by the current thread, but closed by the thread calling close()
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def load(self, folder):
+        """
+        Get the state of the files of a folder
+        :param folder: The absolute path of the folder
+        :return: dictionnary of (size, mtime, digest, bundle) by path
+        """
+        # Every path starting with the folder and a separator (the next character ends the range)
+        rows = self._connection().execute('SELECT path, size, mtime, digest, bundle FROM files '
+                                          'WHERE path >= ? AND path < ?',
+                                          (folder + os.sep, folder + chr(ord(os.sep) + 1)))
+        return {row[0]: row[1:] for row in rows}
+
+    def save(self, path, size, mtime, digest, bundle):
+        with self._connection() as connection:
+            connection.execute('INSERT OR REPLACE INTO files (path, size, mtime, digest, bundle) '
+                               'VALUES (?, ?, ?, ?, ?)', (path, size, mtime, digest, bundle))
+
+    def remove(self, path):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM files WHERE path = ?', (path,))
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def scan_files(folder):
+    """
+    List the files of a folder recursively with their size and modification date
+    :param folder: The path of the folder
+    :return: generator of (path, size, mtime in nanoseconds)
+    """
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from scan_files(entry.path)
+            elif entry.is_file():
+                stat = entry.stat()
+                yield entry.path, stat.st_size, stat.st_mtime_ns
+
+
+def sync_file(key_name, path, hash_method, previous, version, single_file):
+    """
+    Encrypt a new or modified file, a file only touched (same content) is not encrypted again
+    :param key_name: name of key
+    :param path: The path of the file
+    :param hash_method: Algorithm used to check the file after decryption
+    :param previous: State of the file in the manifest (None for a new file)
+    :param version: Format of the encrypted file
+    :param single_file: Write a single file instead of a directory
+    :return: (digest, bundle path, encrypted or not)
+    """
+    if previous is not None:
+        digest = hash_file(DEDUP_HASH, path)
+        if previous[2] == digest and os.path.exists(previous[3]):
+            return digest, previous[3], False
+    # The digest of a new file is computed while it is encrypted so it is read once
+    digests = {DEDUP_HASH: None}
+    bundle = encrypt_file(key_name, path, hash_method, version=version, single_file=single_file, digests=digests)
+    return digests[DEDUP_HASH], bundle, True
+
+
+def commit_file(manifest, path, size, mtime, previous, digest, bundle, encrypted):
+    """
+    Save the new state of a file, the manifest is saved before the previous bundle is removed so a crash leaves at
+    worst an orphan bundle
+    :param manifest: SyncManifest
+    :param path: The path of the file
+    :param size: Size of the file when it was read
+    :param mtime: Modification date of the file when it was read
+    :param previous: State of the file in the manifest (None for a new file)
+    :param digest: Digest of the content
+    :param bundle: The path of the bundle
+    :param encrypted: The file was encrypted again
+    :return: 'added', 'modified' or 'unchanged'
+    """
+    manifest.save(path, size, mtime, digest, bundle)
+    if previous is None:
+        return 'added'
+    if not encrypted:
+        return 'unchanged'
+    if previous[3] != bundle:
+        remove_bundle(previous[3])
+    return 'modified'
+
+
+def sync(key_name, source='source', hash_method='SHA-256', manifest=None, delete=False, workers=WORKERS, version=1,
+         single_file=False, progress=None):
+    """
+    Encrypt only the files added or modified in a folder since the last synchronization.
+    The bundle of a modified file replaces the previous one.
+    :param key_name: name of key
+    :param source: The folder to synchronize
+    :param hash_method: Algorithm used to check the files after decryption
+    :param manifest: SyncManifest (the one of "encrypted-files" by default)
+    :param delete: Remove the bundles of the files deleted from the folder
+    :param workers: Number of files encrypted at the same time
+    :param version: Format of the encrypted files (see VERSIONS)
+    :param single_file: Write a single file per file instead of a directory
+    :param progress: Function called after each changed file with (file path, number of files done, number of files)
+    :return: dictionnary with the files added, modified, unchanged, deleted, the errors and the duration
+    """
+    start = time.perf_counter()
+    own_manifest = manifest is None
+    if own_manifest:
+        manifest = SyncManifest()
+
+    try:
+        folder = os.path.abspath(source)
+        known = manifest.load(folder)
+        report = {'added': [], 'modified': [], 'unchanged': 0, 'deleted': [], 'errors': {}}
+
+        # Only the size and the modification date are compared, the unchanged files are not read
+        changed = {}
+        for path, size, mtime in scan_files(folder):
+            previous = known.pop(path, None)
+            if previous is not None and previous[0] == size and previous[1] == mtime:
+                report['unchanged'] += 1
+            else:
+                changed[path] = (size, mtime, previous)
+
+        def synchronized(path, result):
+            size, mtime, previous = changed[path]
+            status = commit_file(manifest, path, size, mtime, previous, *result)
+            if status == 'unchanged':
+                report['unchanged'] += 1
+            else:
+                report[status].append(path)
+
+        errors = run_pool(lambda path: sync_file(key_name, path, hash_method, changed[path][2], version, single_file),
+                          changed, synchronized, workers, progress)
+        report['errors'] = {path: str(error) for path, error in errors.items()}
+
+        # The files left in the manifest were deleted from the folder
+        if delete:
+            for path, (_, _, _, bundle) in known.items():
+                remove_bundle(bundle)
+                manifest.remove(path)
+                report['deleted'].append(path)
+    finally:
+        if own_manifest:
+            manifest.close()
+
+    report['seconds'] = time.perf_counter() - start
+    return report
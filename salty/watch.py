@@ -0,0 +1,285 @@
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+from salty.crypto import WORKERS
+from salty.sync import SyncManifest, commit_file, scan_files, sync_file
+
+QUEUE_SIZE = 256  # Number of files waiting for a worker, the watcher waits when the queue is full
+DEBOUNCE = 1.0  # Seconds without any write before a file is encrypted
+POLL_INTERVAL = 1.0  # Seconds between two scans of the folder when inotify is not available
+
+# inotify events (see inotify(7))
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+EVENT = struct.Struct('iIII')  # Header of an event: watch descriptor, mask, cookie, length of the name
+
+
+class InotifyWatcher:
+    """
+    Report the files written or moved in a folder and its subfolders with inotify (Linux only)
+    """
+
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, folder):
+        """
+        :param folder: The folder to watch
+        """
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify n\'est pas disponible')
+        self.folders = {}
+        self._add_folder(folder)
+
+    def _add_folder(self, folder):
+        """
+        Watch a folder and its subfolders
+        :return: The files already in the new folders
+        """
+        found = []
+        for root, _, names in os.walk(folder):
+            descriptor = self.libc.inotify_add_watch(self.fd, os.fsencode(root), self.MASK)
+            if descriptor < 0:
+                raise OSError(ctypes.get_errno(), f'Impossible de surveiller {root}')
+            self.folders[descriptor] = root
+            found.extend(os.path.join(root, name) for name in names)
+        return found
+
+    def read(self, timeout):
+        """
+        Wait for events
+        :param timeout: Maximum number of seconds to wait
+        :return: (paths of the files closed after a write or moved in the folder, paths of the files being written,
+            the events were lost and the folder must be scanned again)
+        """
+        closed, written, overflow = [], [], False
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return closed, written, overflow
+
+        data = os.read(self.fd, 64 * 1024)
+        position = 0
+        while position < len(data):
+            descriptor, mask, _, length = EVENT.unpack_from(data, position)
+            name = data[position + EVENT.size:position + EVENT.size + length].rstrip(b'\0')
+            position += EVENT.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            if mask & IN_IGNORED:
+                self.folders.pop(descriptor, None)
+                continue
+            folder = self.folders.get(descriptor)
+            if folder is None:
+                continue
+            path = os.path.join(folder, os.fsdecode(name))
+
+            if mask & IN_ISDIR:
+                # The files written before the new folder was watched have no event
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    closed.extend(self._add_folder(path))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                closed.append(path)
+            elif mask & IN_MODIFY:
+                written.append(path)
+        return closed, written, overflow
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    Report the files whose size or modification date changed by scanning a folder regularly
+    """
+
+    def __init__(self, folder, interval=POLL_INTERVAL):
+        """
+        :param folder: The folder to watch
+        :param interval: Seconds between two scans
+        """
+        self.folder = folder
+        self.interval = interval
+        self.files = {path: (size, mtime) for path, size, mtime in scan_files(folder)}
+        self.next_scan = time.monotonic() + interval
+
+    def read(self, timeout):
+        """
+        Wait for the next scan
+        :param timeout: Maximum number of seconds to wait
+        :return: (paths of the files changed since the previous scan, [], False)
+        """
+        delay = self.next_scan - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return [], [], False
+        time.sleep(max(0.0, delay))
+        self.next_scan = time.monotonic() + self.interval
+
+        files = {path: (size, mtime) for path, size, mtime in scan_files(self.folder)}
+        changed = [path for path, state in files.items() if self.files.get(path) != state]
+        self.files = files
+        return changed, [], False
+
+    def close(self):
+        pass
+
+
+def open_watcher(folder, poll=False):
+    """
+    Watch a folder with inotify, or by scanning it if inotify is not available
+    :param folder: The folder to watch
+    :param poll: Always scan the folder
+    :return: InotifyWatcher or PollingWatcher
+    """
+    # inotify only exists on Linux (the C library is not even found on Windows)
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(folder)
+        except (OSError, AttributeError):
+            pass  # inotify disabled, or too many watched folders
+    return PollingWatcher(folder)
+
+
+def watch(key_name, source='source', hash_method='SHA-256', workers=WORKERS, queue_size=QUEUE_SIZE,
+          debounce=DEBOUNCE, version=1, single_file=False, poll=False, manifest=None, callback=None, stop=None):
+    """
+    Encrypt the files of a folder as soon as they are written, until stop is set.
+    The files added while the watcher was stopped are encrypted when it starts (the state of the files is kept in the
+    manifest of sync).
+    :param key_name: name of key
+    :param source: The folder to watch
+    :param hash_method: Algorithm used to check the files after decryption
+    :param workers: Number of files encrypted at the same time
+    :param queue_size: Number of files waiting for a worker, the folder is not read while the queue is full
+    :param debounce: Seconds without any write before a file is encrypted (partially written files are not encrypted)
+    :param version: Format of the encrypted files (see VERSIONS)
+    :param single_file: Write a single file per file instead of a directory
+    :param poll: Scan the folder instead of using inotify
+    :param manifest: SyncManifest (the one of "encrypted-files" by default)
+    :param callback: Function called after each file with (file path, status or None, error or None)
+    :param stop: threading.Event ending the watch (the files not started yet are encrypted at the next start)
+    """
+    own_manifest = manifest is None
+    if own_manifest:
+        manifest = SyncManifest()
+    if stop is None:
+        stop = threading.Event()
+
+    folder = os.path.abspath(source)
+    watcher = open_watcher(folder, poll)
+    if isinstance(watcher, PollingWatcher):
+        # A scan only sees the writes done since the previous one, a file is finished after a scan without change
+        debounce = max(debounce, watcher.interval)
+    known = manifest.load(folder)
+    tasks = queue.Queue(maxsize=queue_size)
+    results = queue.Queue()
+    pending = {}  # Deadline of the files waiting for the end of their writes
+    running = set()  # Files being encrypted
+
+    def work():
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            path, size, mtime, previous = task
+            try:
+                results.put((task, sync_file(key_name, path, hash_method, previous, version, single_file), None))
+            except Exception as error:
+                results.put((task, None, error))
+
+    def handle_results():
+        while True:
+            try:
+                (path, size, mtime, previous), result, error = results.get_nowait()
+            except queue.Empty:
+                return
+            running.discard(path)
+            status = None
+            if error is None:
+                try:
+                    status = commit_file(manifest, path, size, mtime, previous, *result)
+                    known[path] = (size, mtime, result[0], result[1])
+                except Exception as exception:
+                    error = exception
+            if callback is not None:
+                callback(path, status, error)
+
+    def schedule(paths, delay):
+        deadline = time.monotonic() + delay
+        for path in paths:
+            pending[path] = deadline
+
+    def submit(task):
+        # Backpressure: the folder is not read while the workers are busy, the results are still saved
+        while not stop.is_set():
+            try:
+                tasks.put(task, timeout=0.5)
+                return True
+            except queue.Full:
+                handle_results()
+        return False
+
+    threads = [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        # The files added or modified while the watcher was stopped
+        schedule([path for path, size, mtime in scan_files(folder) if known.get(path, ())[:2] != (size, mtime)],
+                 debounce)
+
+        while not stop.is_set():
+            now = time.monotonic()
+            timeout = min([0.5] + [deadline - now for deadline in pending.values()])
+            closed, written, overflow = watcher.read(max(0.0, timeout))
+            if overflow:
+                schedule([path for path, _, _ in scan_files(folder)], debounce)
+            schedule(closed, debounce)
+            # A file written again is only encrypted once the writes are finished
+            schedule([path for path in written if path in pending], debounce)
+            handle_results()
+
+            now = time.monotonic()
+            for path in [path for path, deadline in pending.items() if deadline <= now]:
+                if path in running:
+                    pending[path] = now + debounce  # Encrypted again once the current encryption is finished
+                    continue
+                del pending[path]
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                previous = known.get(path)
+                if previous is not None and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                if not submit((path, stat.st_size, stat.st_mtime_ns, previous)):
+                    break
+                running.add(path)
+    finally:
+        # The files not started yet are not in the manifest, they are encrypted at the next start
+        while True:
+            try:
+                tasks.get_nowait()
+            except queue.Empty:
+                break
+        for _ in threads:
+            tasks.put(None)
+        for thread in threads:
+            thread.join()
+        handle_results()
+        watcher.close()
+        if own_manifest:
+            manifest.close()
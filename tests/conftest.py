@@ -0,0 +1,14 @@
+import pytest
+from salty import keys
+from salty.keystore import open_key_store
+
+
+@pytest.fixture
+def key(monkeypatch, tmp_path):
+    """
+    AES key of the key "test", the keys "old" and "new" are created too, in a key store of the temporary folder
+    (keys.json is not read nor written)
+    """
+    monkeypatch.setattr(keys, 'key_store', open_key_store(str(tmp_path / 'keys.db')))
+    keys.add_keys(['test', 'old', 'new'], '256')
+    return keys.get_aes_key('test')
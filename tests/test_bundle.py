@@ -0,0 +1,80 @@
+import io
+import os
+import pytest
+from salty.bundle import FIXED, HASH_SLOT_SIZE, MAGIC, pack_header, read_header
+from salty.container import FRAME_SIZE
+from salty.crypto import decrypt_range, decrypt_stream, encrypt_stream, open_encrypted, read_details
+from salty.hashing import new_hash
+
+DETAILS_V1 = {'hash_method': 'SHA-256', 'hash': '', 'key_name': 'clé', 'salt': os.urandom(16).hex(),
+              'iv': 'AAECAwQFBgcICQoLDA0ODw==', 'filename': 'rapport_été', 'extension_file': '.pdf'}
+DETAILS_V2 = {'key_name': 'test', 'version': 2, 'mode': 'GCM', 'nonce': 'AAECAwQFBgc=', 'frame_size': FRAME_SIZE,
+              'filename': 'data', 'extension_file': '', 'size': 0}
+
+
+@pytest.mark.parametrize('details', [DETAILS_V1, DETAILS_V2, dict(DETAILS_V2, hash_method='blake2b', hash='',
+                                                                  salt=os.urandom(16).hex())])
+def test_header_round_trip(details):
+    file = io.BytesIO(pack_header(details) + b'data')
+    assert read_header(file) == details
+    assert file.read() == b'data'
+
+
+def test_header_rewritten_in_place():
+    details = dict(DETAILS_V2, hash_method='SHA-512', hash='', salt=os.urandom(16).hex())
+    header = pack_header(details)
+    final = dict(details, hash=os.urandom(HASH_SLOT_SIZE).hex(), size=2 ** 40)
+    assert len(pack_header(final)) == len(header)
+    assert read_header(io.BytesIO(pack_header(final))) == final
+
+
+def test_header_hash_too_long():
+    with pytest.raises(ValueError):
+        pack_header(dict(DETAILS_V1, hash=os.urandom(HASH_SLOT_SIZE + 1).hex()))
+
+
+@pytest.mark.parametrize('header', [
+    pack_header(DETAILS_V1)[:-1],
+    pack_header(DETAILS_V1)[:FIXED.size - 1],
+    b'NOPE!' + pack_header(DETAILS_V1)[len(MAGIC):],
+    b'',
+])
+def test_header_invalid(header):
+    with pytest.raises(ValueError):
+        read_header(io.BytesIO(header))
+
+
+@pytest.mark.parametrize('version, hash_method', [(1, 'SHA-256'), (2, 'SHA-512'), (2, None)])
+def test_bundle_file_round_trip(key, tmp_path, version, hash_method):
+    data = os.urandom(2 * FRAME_SIZE + 7)
+    bundle = encrypt_stream('test', io.BytesIO(data), 'data', '.bin', hash_method, version=version, single_file=True,
+                            destination=str(tmp_path / 'data.salty'))
+    details = read_details(bundle)
+    assert details['key_name'] == 'test' and details['extension_file'] == '.bin'
+    if hash_method is not None:
+        # The hash written at the end of the encryption is the one of the data
+        expected = new_hash(hash_method)
+        expected.update(data + details['salt'].encode('utf-8'))
+        assert details['hash'] == expected.hexdigest()
+    if version == 2:
+        assert details['size'] == len(data)
+
+    output = io.BytesIO()
+    assert decrypt_stream(bundle, output)
+    assert output.getvalue() == data
+
+    _, file, start, size = open_encrypted(bundle)
+    file.close()
+    assert start == len(pack_header(details)) and start + size == os.path.getsize(bundle)
+    if version == 2:
+        assert b''.join(decrypt_range(bundle, FRAME_SIZE - 3, 10)) == data[FRAME_SIZE - 3:FRAME_SIZE + 7]
+
+
+def test_bundle_file_tampering(key, tmp_path):
+    bundle = encrypt_stream('test', io.BytesIO(os.urandom(1000)), 'data', '.bin', 'SHA-256', version=2,
+                            single_file=True, destination=str(tmp_path / 'data.salty'))
+    encrypted = bytearray(open(bundle, 'rb').read())
+    encrypted[-1] ^= 1
+    with open(bundle, 'wb') as file:
+        file.write(encrypted)
+    assert not decrypt_stream(bundle, io.BytesIO())
@@ -0,0 +1,129 @@
+import io
+import os
+import pytest
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+from salty.container import FRAME_SIZE, NONCE_PREFIX_SIZE, TAG_SIZE, IntegrityError, decrypt_frames, \
+    encrypt_frames, frames_count, plain_size, read_range
+from salty.crypto import CHUNK_SIZE, PARTIAL_FOLDER, decrypt, decrypt_stream, encrypt_stream, read_chunks
+from salty.files import FILE_MODE
+
+BLOCK = AES.block_size
+SIZES = [0, 1, BLOCK - 1, BLOCK, BLOCK + 1, FRAME_SIZE - 1, FRAME_SIZE, FRAME_SIZE + 1, 3 * FRAME_SIZE]
+
+
+def encrypt_data(key, prefix, data, workers=1):
+    return b''.join(encrypt_frames(key, prefix, read_chunks(io.BytesIO(data), FRAME_SIZE), workers))
+
+
+def decrypt_data(key, prefix, encrypted, workers=1):
+    return b''.join(decrypt_frames(key, prefix, read_chunks(io.BytesIO(encrypted), FRAME_SIZE + TAG_SIZE), workers))
+
+
+@pytest.fixture
+def prefix():
+    return get_random_bytes(NONCE_PREFIX_SIZE)
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+@pytest.mark.parametrize('size', SIZES)
+def test_frames_round_trip(key, prefix, size, workers):
+    data = os.urandom(size)
+    encrypted = encrypt_data(key, prefix, data, workers)
+    assert len(encrypted) == size + frames_count(len(encrypted)) * TAG_SIZE
+    assert plain_size(len(encrypted)) == size
+    assert decrypt_data(key, prefix, encrypted, workers) == data
+
+
+@pytest.mark.parametrize('version', [1, 2])
+@pytest.mark.parametrize('size', SIZES + [CHUNK_SIZE - 1, CHUNK_SIZE + BLOCK])
+def test_stream_round_trip(key, tmp_path, version, size):
+    data = os.urandom(size)
+    bundle = encrypt_stream('test', io.BytesIO(data), 'data', '.bin', 'SHA-256', version=version,
+                            destination=str(tmp_path / 'bundle'))
+    output = io.BytesIO()
+    assert decrypt_stream(bundle, output)
+    assert output.getvalue() == data
+
+
+@pytest.mark.parametrize('change', [
+    lambda encrypted: encrypted[:-(FRAME_SIZE + TAG_SIZE) // 2],  # cut inside the last frame
+    lambda encrypted: encrypted[:2 * (FRAME_SIZE + TAG_SIZE)],  # last frame removed
+    lambda encrypted: encrypted[FRAME_SIZE + TAG_SIZE:],  # first frame removed
+    lambda encrypted: encrypted[FRAME_SIZE + TAG_SIZE:2 * (FRAME_SIZE + TAG_SIZE)]
+    + encrypted[:FRAME_SIZE + TAG_SIZE] + encrypted[2 * (FRAME_SIZE + TAG_SIZE):],  # frames swapped
+    lambda encrypted: encrypted[:100] + bytes([encrypted[100] ^ 1]) + encrypted[101:],  # data modified
+    lambda encrypted: encrypted[:-1] + bytes([encrypted[-1] ^ 1]),  # tag modified
+])
+def test_frames_tampering(key, prefix, change):
+    encrypted = encrypt_data(key, prefix, os.urandom(2 * FRAME_SIZE + 10))
+    with pytest.raises(IntegrityError):
+        decrypt_data(key, prefix, change(encrypted))
+
+
+def test_frames_other_prefix(key, prefix):
+    encrypted = encrypt_data(key, prefix, os.urandom(10))
+    with pytest.raises(IntegrityError):
+        decrypt_data(key, get_random_bytes(NONCE_PREFIX_SIZE), encrypted)
+
+
+@pytest.mark.parametrize('version', [1, 2])
+def test_stream_tampering(key, tmp_path, version):
+    bundle = encrypt_stream('test', io.BytesIO(os.urandom(3 * FRAME_SIZE)), 'data', '.bin', 'SHA-256',
+                            version=version, destination=str(tmp_path / 'bundle'))
+    path = tmp_path / 'bundle' / 'data.encrypted'
+    encrypted = path.read_bytes()
+    path.write_bytes(encrypted[:FRAME_SIZE] + bytes([encrypted[FRAME_SIZE] ^ 1]) + encrypted[FRAME_SIZE + 1:])
+    assert not decrypt_stream(bundle, io.BytesIO())
+
+    path.write_bytes(encrypted[:-(FRAME_SIZE + TAG_SIZE)])
+    try:
+        assert not decrypt_stream(bundle, io.BytesIO())
+    except ValueError:  # Format 1 fails on the padding of the new last block, unless it is valid by chance
+        assert version == 1
+
+
+@pytest.mark.parametrize('offset, length', [
+    (0, 1), (0, FRAME_SIZE), (FRAME_SIZE - 1, 2), (FRAME_SIZE, FRAME_SIZE), (100, 2 * FRAME_SIZE),
+    (3 * FRAME_SIZE - 1, 1), (3 * FRAME_SIZE + 99, 1), (3 * FRAME_SIZE + 50, 1000), (0, 10 ** 9),
+    (3 * FRAME_SIZE + 100, 1), (10 ** 9, 1), (10, 0),
+])
+@pytest.mark.parametrize('workers', [1, 2])
+def test_read_range(key, prefix, offset, length, workers):
+    data = os.urandom(3 * FRAME_SIZE + 100)
+    header = b'header'
+    encrypted = encrypt_data(key, prefix, data)
+    file = io.BytesIO(header + encrypted)
+    part = b''.join(read_range(file, len(encrypted), key, prefix, offset, length, workers=workers, start=len(header)))
+    assert part == data[offset:offset + length]
+
+
+def test_read_range_tampering(key, prefix):
+    data = os.urandom(3 * FRAME_SIZE)
+    encrypted = bytearray(encrypt_data(key, prefix, data))
+    encrypted[FRAME_SIZE + TAG_SIZE + 10] ^= 1
+    file = io.BytesIO(bytes(encrypted))
+    assert b''.join(read_range(file, len(encrypted), key, prefix, 0, FRAME_SIZE)) == data[:FRAME_SIZE]
+    with pytest.raises(IntegrityError):
+        b''.join(read_range(file, len(encrypted), key, prefix, FRAME_SIZE, 1))
+
+
+def test_decrypt_tampering_outside_destination(key, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = os.urandom(3 * FRAME_SIZE)
+    bundle = encrypt_stream('test', io.BytesIO(data), 'data', '.bin', None, version=2,
+                            destination=str(tmp_path / 'bundle'))
+    path = tmp_path / 'bundle' / 'data.encrypted'
+    encrypted = path.read_bytes()
+    path.write_bytes(encrypted[:-1] + bytes([encrypted[-1] ^ 1]))
+
+    # The frames checked before the tampered one are never written in destination
+    seen = []
+    assert not decrypt(bundle, lambda done: seen.append(os.listdir(tmp_path / 'destination')))
+    assert seen and not any(seen)
+    assert os.listdir(tmp_path / 'destination') == [] and os.listdir(tmp_path / PARTIAL_FOLDER) == []
+
+    path.write_bytes(encrypted)
+    assert decrypt(bundle)
+    assert (tmp_path / 'destination' / 'bundle.bin').read_bytes() == data
+    assert os.stat(tmp_path / 'destination' / 'bundle.bin').st_mode & 0o777 == FILE_MODE
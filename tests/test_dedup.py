@@ -0,0 +1,85 @@
+import os
+import pytest
+from salty import dedup
+from salty.crypto import encrypt_file, list_bundles, read_details, remove_bundle
+from salty.dedup import DedupIndex
+from salty.rotate import rotate_bundle
+
+
+@pytest.fixture
+def index(key, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write('a.txt', b'a' * 1000)
+    return DedupIndex(str(tmp_path / 'dedup.db'))
+
+
+def write(path, data):
+    with open(path, 'wb') as file:
+        file.write(data)
+
+
+def test_hit(index):
+    bundle = encrypt_file('old', 'a.txt', 'SHA-256', dedup=index)
+    assert encrypt_file('old', 'a.txt', 'SHA-256', dedup=index) == bundle
+
+    # Another file with the same content reuses the bundle too
+    write('copy.txt', b'a' * 1000)
+    assert encrypt_file('old', 'copy.txt', 'SHA-256', dedup=index) == bundle
+    assert index.hits == 2 and index.reused_bytes == 2000
+    assert len(list_bundles()) == 1
+
+
+def test_miss(index):
+    bundle = encrypt_file('old', 'a.txt', 'SHA-256', dedup=index)
+    write('b.txt', b'b' * 1000)
+    assert encrypt_file('old', 'b.txt', 'SHA-256', dedup=index) != bundle
+
+    # Same content with another key or other settings
+    assert encrypt_file('new', 'a.txt', 'SHA-256', dedup=index) != bundle
+    assert encrypt_file('old', 'a.txt', 'SHA-256', version=2, dedup=index) != bundle
+    assert encrypt_file('old', 'a.txt', 'SHA-512', dedup=index) != bundle
+    assert index.hits == 0
+    assert len(list_bundles()) == 5
+
+
+def test_modified_file(index):
+    bundle = encrypt_file('old', 'a.txt', 'SHA-256', dedup=index)
+    write('a.txt', b'changed')
+    new = encrypt_file('old', 'a.txt', 'SHA-256', dedup=index)
+    assert new != bundle and index.hits == 0
+
+
+def test_bundle_deleted(index):
+    bundle = encrypt_file('old', 'a.txt', 'SHA-256', dedup=index)
+    remove_bundle(bundle)
+    new = encrypt_file('old', 'a.txt', 'SHA-256', dedup=index)
+    assert os.path.exists(new) and index.hits == 0
+    assert encrypt_file('old', 'a.txt', 'SHA-256', dedup=index) == new
+
+
+def test_bundle_key_changed(index):
+    bundle = encrypt_file('old', 'a.txt', 'SHA-256', dedup=index)
+    assert rotate_bundle(bundle, 'old', 'new')
+    new = encrypt_file('old', 'a.txt', 'SHA-256', dedup=index)
+    assert new != bundle and index.hits == 0
+    assert read_details(new)['key_name'] == 'old'
+
+
+def test_eviction(index, monkeypatch):
+    monkeypatch.setattr(dedup, 'EVICT_INTERVAL', 10)
+    index = DedupIndex(index.path, max_entries=5)
+
+    def count(table):
+        return index._connection().execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+    counts = []
+    for number in range(100):
+        index.remember(f'/file{number}', 1, 1, f'digest{number}', 'old', '', f'/bundle{number}')
+        counts.append(count('files'))
+        assert count('contents') == counts[-1]
+
+    # The index is trimmed once every EVICT_INTERVAL files, it never exceeds max_entries + EVICT_INTERVAL
+    assert max(counts) <= 5 + 10
+    assert counts[90] == 5  # The files 1, 11, 21... 91 trigger an eviction
+    assert index.file_digest('/file99', 1, 1) == 'digest99'
+    assert index.file_digest('/file0', 1, 1) is None
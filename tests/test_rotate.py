@@ -0,0 +1,154 @@
+import io
+import json
+import os
+import pytest
+from salty import keys
+from salty.container import FRAME_SIZE
+from salty.crypto import decrypt_stream, encrypt_stream, read_details
+from salty.rotate import recover, recover_folder, rotate_bundle, rotate_key, rotation_paths
+
+DATA = os.urandom(2 * FRAME_SIZE + 10)
+
+
+def make_bundle(folder, name, key_name='old', single_file=False, version=2, data=DATA):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, name + ('.salty' if single_file else ''))
+    return encrypt_stream(key_name, io.BytesIO(data), 'data', '.bin', 'SHA-256', version=version,
+                          single_file=single_file, destination=path)
+
+
+def decrypted(bundle):
+    output = io.BytesIO()
+    assert decrypt_stream(bundle, output)
+    return output.getvalue()
+
+
+def hidden_files(folder):
+    return [name for name in os.listdir(folder) if name.startswith('.')]
+
+
+@pytest.mark.parametrize('version', [1, 2])
+@pytest.mark.parametrize('single_file', [False, True])
+def test_rotate_bundle(key, tmp_path, single_file, version):
+    bundle = make_bundle(tmp_path, 'a', single_file=single_file, version=version)
+    assert rotate_bundle(bundle, 'old', 'new')
+    assert read_details(bundle)['key_name'] == 'new'
+    assert decrypted(bundle) == DATA
+    assert hidden_files(tmp_path) == []
+
+
+def test_rotate_bundle_other_key(key, tmp_path):
+    bundle = make_bundle(tmp_path, 'a', key_name='new', single_file=True)
+    content = open(bundle, 'rb').read()
+    assert rotate_bundle(bundle, 'old', 'new') is None
+    assert open(bundle, 'rb').read() == content
+
+
+@pytest.mark.parametrize('version', [1, 2])
+def test_rotate_bundle_mismatch_keeps_original(key, tmp_path, version):
+    bundle = make_bundle(tmp_path, 'a', version=version)
+    encrypted = os.path.join(bundle, 'data.encrypted')
+    if version == 1:
+        # The hash of the details does not match the data any more
+        details = read_details(bundle)
+        with open(os.path.join(bundle, 'data-relations.json'), 'w') as file:
+            json.dump(dict(details, hash='00' * 32), file)
+    else:
+        with open(encrypted, 'r+b') as file:
+            file.seek(FRAME_SIZE + 20)
+            byte = file.read(1)
+            file.seek(FRAME_SIZE + 20)
+            file.write(bytes([byte[0] ^ 1]))
+    content = open(encrypted, 'rb').read()
+
+    assert rotate_bundle(bundle, 'old', 'new') is False
+    assert read_details(bundle)['key_name'] == 'old'
+    assert open(encrypted, 'rb').read() == content
+    assert hidden_files(tmp_path) == []
+
+
+def test_recover_only_rotating(key, tmp_path):
+    # Crash while the new bundle was written: it is removed, the bundle is kept
+    bundle = make_bundle(tmp_path, 'a')
+    _, rotating, _ = rotation_paths(bundle)
+    make_bundle(tmp_path, os.path.basename(rotating), key_name='new', data=DATA[:100])
+    recover_folder(str(tmp_path))
+    assert hidden_files(tmp_path) == []
+    assert read_details(bundle)['key_name'] == 'old'
+    assert decrypted(bundle) == DATA
+
+
+def test_recover_old_without_bundle(key, tmp_path):
+    # Crash between the two renames: the complete new bundle takes the name of the bundle
+    bundle = make_bundle(tmp_path, 'a')
+    _, rotating, old = rotation_paths(bundle)
+    make_bundle(tmp_path, os.path.basename(rotating), key_name='new')
+    os.rename(bundle, old)
+    recover_folder(str(tmp_path))
+    assert hidden_files(tmp_path) == []
+    assert read_details(bundle)['key_name'] == 'new'
+    assert decrypted(bundle) == DATA
+
+
+def test_recover_old_with_new_bundle(key, tmp_path):
+    # Crash before the old bundle was removed: it is removed, the new bundle is kept
+    bundle = make_bundle(tmp_path, 'a', key_name='new')
+    _, _, old = rotation_paths(bundle)
+    make_bundle(tmp_path, os.path.basename(old))
+    recover(bundle)
+    assert hidden_files(tmp_path) == []
+    assert read_details(bundle)['key_name'] == 'new'
+    assert decrypted(bundle) == DATA
+
+
+def test_rotate_key(key, tmp_path):
+    folder = str(tmp_path / 'encrypted-files')
+    make_bundle(folder, 'a')
+    make_bundle(folder, 'b', single_file=True)
+    make_bundle(folder, 'c', key_name='new')
+    # An interrupted rotation is recovered before the bundles are listed
+    _, rotating, _ = rotation_paths(os.path.join(folder, 'a'))
+    make_bundle(folder, os.path.basename(rotating), key_name='new')
+
+    report = rotate_key('old', 'new', workers=2, deactivate=True, folder=folder)
+    assert sorted(os.path.basename(path) for path in report['rotated']) == ['a', 'b.salty']
+    assert report['skipped'] == 1
+    assert not (report['hash_mismatch'] or report['missing_key'] or report['errors'])
+    assert not keys.key_store.get('old')['activate']
+    assert hidden_files(folder) == []
+
+    # Running it again skips everything
+    assert rotate_key('old', 'new', folder=folder)['skipped'] == 3
+
+
+def test_rotate_key_errors_keep_old_key(key, tmp_path):
+    folder = str(tmp_path / 'encrypted-files')
+    make_bundle(folder, 'a')
+    bundle = make_bundle(folder, 'b')
+    with open(os.path.join(bundle, 'data.encrypted'), 'r+b') as file:
+        file.write(b'\0' * 16)
+    os.makedirs(os.path.join(folder, 'c'))
+    with open(os.path.join(folder, 'c', 'data-relations.json'), 'w') as file:
+        file.write('{')
+
+    report = rotate_key('old', 'new', deactivate=True, folder=folder)
+    assert len(report['rotated']) == 1
+    assert [os.path.basename(path) for path in report['hash_mismatch']] == ['b']
+    assert [os.path.basename(path) for path in report['errors']] == ['c']
+    assert keys.key_store.get('old')['activate']
+
+    # The old key is deactivated once the last error is gone
+    os.remove(os.path.join(folder, 'c', 'data-relations.json'))
+    os.rmdir(os.path.join(folder, 'c'))
+    bundle = make_bundle(folder, 'b2')
+    report = rotate_key('old', 'new', [bundle], deactivate=True, folder=folder)
+    assert len(report['rotated']) == 1
+    assert not keys.key_store.get('old')['activate']
+
+
+def test_rotate_key_refuses_deactivated_key(key, tmp_path):
+    keys.activate_or_desactivate_key('new', False)
+    with pytest.raises(keys.KeyDeactivatedError):
+        rotate_key('old', 'new', folder=str(tmp_path))
+    with pytest.raises(ValueError):
+        rotate_key('old', 'old', folder=str(tmp_path))
@@ -0,0 +1,113 @@
+import io
+import os
+import pytest
+from salty.crypto import decrypt_stream, list_bundles, remove_bundle
+from salty.sync import SyncManifest, commit_file, sync, sync_file
+
+
+@pytest.fixture
+def source(key, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('source/sub')
+    write('source/a.txt', b'a' * 1000)
+    write('source/sub/b.txt', b'b' * 2000)
+    return os.path.abspath('source')
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = SyncManifest(str(tmp_path / 'sync.db'))
+    yield manifest
+    manifest.close()
+
+
+def write(path, data):
+    with open(path, 'wb') as file:
+        file.write(data)
+
+
+def decrypted(bundle):
+    output = io.BytesIO()
+    assert decrypt_stream(bundle, output)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize('single_file', [False, True])
+def test_sync(source, manifest, single_file):
+    a, b = os.path.join(source, 'a.txt'), os.path.join(source, 'sub', 'b.txt')
+    report = sync('test', source, manifest=manifest, workers=2, version=2, single_file=single_file)
+    assert sorted(report['added']) == [a, b] and report['unchanged'] == 0 and not report['errors']
+    bundles = {path: state[3] for path, state in manifest.load(source).items()}
+    assert decrypted(bundles[a]) == b'a' * 1000
+
+    # Nothing changed
+    report = sync('test', source, manifest=manifest, version=2, single_file=single_file)
+    assert report['unchanged'] == 2 and not (report['added'] or report['modified'])
+
+    # a is modified, b is only touched: b keeps its bundle
+    write(a, b'new content')
+    stat = os.stat(b)
+    os.utime(b, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    report = sync('test', source, manifest=manifest, version=2, single_file=single_file)
+    assert report['modified'] == [a] and report['unchanged'] == 1
+    state = manifest.load(source)
+    assert not os.path.exists(bundles[a])
+    assert decrypted(state[a][3]) == b'new content'
+    assert state[b][3] == bundles[b] and state[b][1] == stat.st_mtime_ns + 10 ** 9
+    assert len(list_bundles()) == 2
+
+
+def test_sync_delete(source, manifest):
+    a = os.path.join(source, 'a.txt')
+    sync('test', source, manifest=manifest)
+    bundle = manifest.load(source)[a][3]
+    os.remove(a)
+
+    report = sync('test', source, manifest=manifest)
+    assert report['deleted'] == [] and os.path.exists(bundle)
+
+    report = sync('test', source, manifest=manifest, delete=True)
+    assert report['deleted'] == [a]
+    assert not os.path.exists(bundle)
+    assert a not in manifest.load(source)
+    assert len(list_bundles()) == 1
+
+
+def test_sync_file_same_content(source):
+    a = os.path.join(source, 'a.txt')
+    digest, bundle, encrypted = sync_file('test', a, 'SHA-256', None, 1, False)
+    assert encrypted
+    assert sync_file('test', a, 'SHA-256', (0, 0, digest, bundle), 1, False) == (digest, bundle, False)
+
+    # The bundle was deleted: the file is encrypted again
+    remove_bundle(bundle)
+    assert sync_file('test', a, 'SHA-256', (0, 0, digest, bundle), 1, False)[2]
+
+
+def test_commit_file_saves_before_removing(source, manifest):
+    a = os.path.join(source, 'a.txt')
+    old = sync_file('test', a, 'SHA-256', None, 1, False)
+    write(a, b'new content')
+    new = sync_file('test', a, 'SHA-256', (1000, 0) + old[:2], 1, False)
+
+    save = manifest.save
+    saved = []
+
+    def check_save(*args):
+        saved.append(os.path.exists(old[1]))
+        save(*args)
+
+    manifest.save = check_save
+    assert commit_file(manifest, a, 11, 1, (1000, 0) + old[:2], *new) == 'modified'
+    assert saved == [True]
+    assert not os.path.exists(old[1])
+    assert manifest.load(source)[a] == (11, 1) + new[:2]
+
+    # The previous bundle is kept when the manifest is not saved
+    def fail_save(*args):
+        raise OSError('disque plein')
+
+    manifest.save = fail_save
+    with pytest.raises(OSError):
+        commit_file(manifest, a, 12, 2, (11, 1) + new[:2], *sync_file('test', a, 'SHA-256', None, 1, False))
+    assert os.path.exists(new[1])